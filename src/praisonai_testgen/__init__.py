@@ -45,7 +45,10 @@ def __getattr__(name: str):
         module_name, attr_name = _LAZY_IMPORTS[name]
         import importlib
         module = importlib.import_module(f".{module_name}", __name__)
-        return getattr(module, attr_name)
+        value = getattr(module, attr_name)
+        # Cache so later lookups bypass __getattr__ entirely
+        globals()[name] = value
+        return value
     raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
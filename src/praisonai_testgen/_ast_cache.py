@@ -0,0 +1,70 @@
+"""
+On-disk cache of parse_python_ast results.
+
+Entries are pickles named by the sha256 of the source bytes and a tag of the
+Python version, package version and result format, so an edited file, an
+upgrade or a change to the collector output never picks up a stale entry.
+Loading and storing are best-effort: any failure is treated as a miss.
+
+The cache lives under $XDG_CACHE_HOME (default ~/.cache). Set
+PRAISONAI_TESTGEN_AST_CACHE to another directory to move it, or to an empty
+string or "0" to turn it off.
+"""
+
+import hashlib
+import os
+import pickle
+import sys
+from pathlib import Path
+from typing import Any, Optional
+
+from . import __version__
+
+
+def _default_cache_dir() -> Optional[Path]:
+    """Resolve the cache directory from the environment; None disables caching."""
+    override = os.environ.get("PRAISONAI_TESTGEN_AST_CACHE")
+    if override is not None:
+        return Path(override) if override not in ("", "0") else None
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "praisonai_testgen" / "ast"
+
+
+CACHE_DIR = _default_cache_dir()
+
+# Bump whenever the layout of tools._collect results changes
+FORMAT = 6
+
+_TAG = f"{sys.version_info[:3]}|{__version__}|{FORMAT}".encode()
+
+
+def cache_path(source: bytes) -> Optional[Path]:
+    """Return the cache file for a module's source bytes, or None if caching is off."""
+    if CACHE_DIR is None:
+        return None
+    digest = hashlib.sha256(source)
+    digest.update(_TAG)
+    return CACHE_DIR / f"{digest.hexdigest()}.pkl"
+
+
+def load(path: Optional[Path]) -> Optional[Any]:
+    """Return the value cached at path, or None if missing or unreadable."""
+    if path is None:
+        return None
+    try:
+        return pickle.loads(path.read_bytes())
+    except Exception:
+        return None
+
+
+def store(path: Optional[Path], value: Any) -> None:
+    """Atomically write value to path, ignoring filesystem errors."""
+    if path is None:
+        return
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_bytes(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
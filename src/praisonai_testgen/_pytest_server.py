@@ -0,0 +1,265 @@
+"""
+Persistent pytest worker.
+
+Run as ``python -m praisonai_testgen._pytest_server``: pytest is imported once
+and each test module sent over stdin is executed in-process, so validating many
+generated files pays interpreter startup only once. Requests and replies are
+length-prefixed JSON frames; replies are plain dicts so a crashing test only
+takes down the worker, which the client respawns on the next request.
+"""
+
+import contextlib
+import io
+import itertools
+import json
+import os
+import queue
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import weakref
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+_HEADER = struct.Struct(">I")
+
+# Worker entry point. Only the worker's own interpreter knows whether the package
+# is importable, so a source checkout's root is appended to sys.path there, and
+# only when needed, rather than put in front of the caller's PYTHONPATH
+_BOOTSTRAP = """\
+import importlib.util, runpy, sys
+if importlib.util.find_spec({package!r}) is None:
+    sys.path.append({root!r})
+runpy.run_module({module!r}, run_name="__main__", alter_sys=True)
+"""
+_module_ids = itertools.count()
+
+# pytest.main and stdout/stderr redirection act on the whole process, so
+# in-process runs from several threads take turns
+_run_lock = threading.Lock()
+
+# One-shot runs skip the terminal header, cache dir, stepwise/warnings plugins,
+# and any rootdir search or addopts inherited from surrounding config files
+_PYTEST_ARGS = (
+    "-q", "--no-header", "--tb=short", "-s",
+    "-p", "no:cacheprovider", "-p", "no:stepwise", "-p", "no:warnings",
+    "-o", "addopts=", "--import-mode=importlib",
+)
+
+
+def run_code(test_code: str, workdir: str) -> dict:
+    """
+    Execute pytest in-process on test code written under workdir.
+
+    The working directory is left alone (rootdir is pinned to workdir
+    instead), and concurrent calls are serialized.
+
+    Args:
+        test_code: Python test code to execute
+        workdir: Existing directory to write the test module into
+
+    Returns:
+        Dictionary with pass/fail status, exit code, and output
+    """
+    import pytest
+
+    # Unique module names keep earlier runs in sys.modules from shadowing this one
+    test_file = Path(workdir) / f"test_temp_{next(_module_ids)}.py"
+    test_file.write_text(test_code)
+
+    stdout, stderr = io.StringIO(), io.StringIO()
+    try:
+        with _run_lock, contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            exit_code = int(pytest.main(
+                [str(test_file), "--rootdir", workdir, *_PYTEST_ARGS]
+            ))
+    finally:
+        test_file.unlink()
+
+    return {
+        "passed": exit_code == 0,
+        "exit_code": exit_code,
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue(),
+    }
+
+
+def _read_frame(stream: BinaryIO) -> Optional[dict]:
+    """Read one length-prefixed JSON frame, or None at EOF."""
+    header = stream.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        return None
+    (size,) = _HEADER.unpack(header)
+    payload = stream.read(size)
+    if len(payload) < size:
+        return None
+    return json.loads(payload)
+
+
+def _write_frame(stream: BinaryIO, message: dict) -> None:
+    """Write one length-prefixed JSON frame."""
+    payload = json.dumps(message).encode()
+    stream.write(_HEADER.pack(len(payload)) + payload)
+    stream.flush()
+
+
+def main() -> None:
+    """Serve run requests from stdin until EOF."""
+    requests = sys.stdin.buffer
+    replies = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    # Keep stray fd-level writes from tests off the reply channel
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    import pytest  # noqa: F401 - warm the import before the first request
+
+    with tempfile.TemporaryDirectory() as workdir:
+        while (request := _read_frame(requests)) is not None:
+            if request.get("cmd") == "run":
+                reply = run_code(request["code"], workdir)
+            else:
+                reply = {"error": f"unknown command: {request.get('cmd')!r}"}
+            _write_frame(replies, reply)
+
+
+def _shutdown(proc: subprocess.Popen) -> None:
+    """Close the worker's stdin and wait for it to exit."""
+    if proc.stdin:
+        proc.stdin.close()
+    try:
+        proc.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+    if proc.stdout:
+        proc.stdout.close()
+
+
+class PytestWorker:
+    """
+    Client for a long-lived pytest worker subprocess.
+
+    Example:
+        >>> worker = PytestWorker()
+        >>> worker.run("def test_ok():\\n    assert True\\n")["passed"]
+        True
+    """
+
+    def __init__(self):
+        self._proc: Optional[subprocess.Popen] = None
+        self._finalizer: Optional[weakref.finalize] = None
+
+    def _ensure_started(self) -> subprocess.Popen:
+        if self._proc is None or self._proc.poll() is not None:
+            self.close()
+            bootstrap = _BOOTSTRAP.format(
+                package=__package__,
+                root=str(Path(__file__).resolve().parent.parent),
+                module=__name__,
+            )
+            # Generated tests only need pytest itself, not every installed plugin
+            env = dict(os.environ, PYTEST_DISABLE_PLUGIN_AUTOLOAD="1")
+            self._proc = subprocess.Popen(
+                [sys.executable, "-u", "-c", bootstrap],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                env=env,
+            )
+            self._finalizer = weakref.finalize(self, _shutdown, self._proc)
+        return self._proc
+
+    def run(self, test_code: str) -> dict:
+        """
+        Execute pytest on test code in the worker.
+
+        Args:
+            test_code: Python test code to execute
+
+        Returns:
+            Dictionary with pass/fail status, exit code, and output
+        """
+        proc = self._ensure_started()
+        try:
+            _write_frame(proc.stdin, {"cmd": "run", "code": test_code})
+            reply = _read_frame(proc.stdout)
+        except OSError:
+            reply = None
+
+        if reply is None:
+            # Worker died mid-run; it is respawned on the next request
+            self.close()
+            return {
+                "passed": False,
+                "exit_code": -1,
+                "stdout": "",
+                "stderr": "pytest worker exited unexpectedly",
+            }
+        return reply
+
+    def close(self) -> None:
+        """Stop the worker process if it is running."""
+        if self._finalizer is not None:
+            self._finalizer()
+        self._proc = None
+        self._finalizer = None
+
+
+class PytestPool:
+    """
+    A small set of warm PytestWorker processes shared between callers.
+
+    Workers are started on demand up to ``size``; a caller borrows an idle
+    worker for one run and returns it afterwards, so concurrent runs never
+    share a pipe.
+
+    Example:
+        >>> pool = PytestPool(size=2)
+        >>> pool.run("def test_ok():\\n    assert True\\n")["passed"]
+        True
+    """
+
+    def __init__(self, size: Optional[int] = None):
+        self.size = size or min(4, os.cpu_count() or 1)
+        self._idle: "queue.Queue[PytestWorker]" = queue.Queue()
+        self._workers: list = []
+        self._lock = threading.Lock()
+
+    def _acquire(self) -> PytestWorker:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._workers) < self.size:
+                worker = PytestWorker()
+                self._workers.append(worker)
+                return worker
+        return self._idle.get()
+
+    def run(self, test_code: str) -> dict:
+        """
+        Execute pytest on test code in an idle worker.
+
+        Args:
+            test_code: Python test code to execute
+
+        Returns:
+            Dictionary with pass/fail status, exit code, and output
+        """
+        worker = self._acquire()
+        try:
+            return worker.run(test_code)
+        finally:
+            self._idle.put(worker)
+
+    def close(self) -> None:
+        """Stop every worker in the pool."""
+        with self._lock:
+            for worker in self._workers:
+                worker.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,27 +2,31 @@
 TestGen Agents - Mini pattern agents for test generation.
 
 Uses the minimal Agent configuration: name + instructions + tools
+
+Agents are constructed on first access, so importing this module stays cheap.
 """
 
-from praisonaiagents import Agent
-from .tools import (
-    parse_python_ast,
-    infer_types,
-    extract_source_code,
-    generate_test_code,
-    create_fixtures,
-    run_pytest,
-    run_pytest_isolated,
-    validate_test_quality,
-)
+import functools
+from typing import TYPE_CHECKING
 
-# ============================================================================
-# AGENTS - Mini pattern: just name + instructions + tools
-# ============================================================================
+if TYPE_CHECKING:
+    from praisonaiagents import Agent
+    
+    # Built lazily by __getattr__ below
+    analyzer: Agent
+    generator: Agent
+    validator: Agent
+
+__all__ = [
+    "analyzer",
+    "generator",
+    "validator",
+    "get_analyzer",
+    "get_generator",
+    "get_validator",
+]
 
-analyzer = Agent(
-    name="Analyzer",
-    instructions="""Parse Python code and identify all testable functions and classes.
+_ANALYZER_INSTRUCTIONS = """Parse Python code and identify all testable functions and classes.
 
 For each function/method, extract:
 - Function name and signature
@@ -35,13 +39,9 @@ For each function/method, extract:
 Use the parse_python_ast tool to analyze files. Use extract_source_code to get 
 the full source of specific functions when needed.
 
-Output a structured analysis that the Generator can use to create tests.""",
-    tools=[parse_python_ast, infer_types, extract_source_code],
-)
+Output a structured analysis that the Generator can use to create tests."""
 
-generator = Agent(
-    name="Generator",
-    instructions="""Create comprehensive pytest tests for the analyzed code.
+_GENERATOR_INSTRUCTIONS = """Create comprehensive pytest tests for the analyzed code.
 
 For each function, generate tests that cover:
 - Happy path with typical inputs
@@ -56,13 +56,9 @@ Generated tests MUST:
 1. Be valid Python/pytest syntax
 2. Have actual assertions (not just 'pass' or 'assert True')
 3. Follow AAA pattern: Arrange, Act, Assert
-4. Include descriptive test names and docstrings""",
-    tools=[generate_test_code, create_fixtures],
-)
+4. Include descriptive test names and docstrings"""
 
-validator = Agent(
-    name="Validator",
-    instructions="""Validate that generated tests meet quality standards.
+_VALIDATOR_INSTRUCTIONS = """Validate that generated tests meet quality standards.
 
 Check that tests:
 1. Compile without syntax errors
@@ -74,8 +70,74 @@ Check that tests:
 Use run_pytest_isolated to test code in isolation. Use validate_test_quality
 to check code quality with AI judgment.
 
-Provide specific feedback for any failures so Generator can improve.""",
-    tools=[run_pytest, run_pytest_isolated, validate_test_quality],
-)
+Provide specific feedback for any failures so Generator can improve."""
+
+
+# ============================================================================
+# AGENTS - Mini pattern: just name + instructions + tools
+# ============================================================================
 
-__all__ = ["analyzer", "generator", "validator"]
+_AGENT_SPECS = {
+    "analyzer": {
+        "name": "Analyzer",
+        "instructions": _ANALYZER_INSTRUCTIONS,
+        "tools": ("parse_python_ast", "infer_types", "extract_source_code"),
+    },
+    "generator": {
+        "name": "Generator",
+        "instructions": _GENERATOR_INSTRUCTIONS,
+        "tools": ("generate_test_code", "create_fixtures"),
+    },
+    "validator": {
+        "name": "Validator",
+        "instructions": _VALIDATOR_INSTRUCTIONS,
+        "tools": ("run_pytest", "run_pytest_isolated", "validate_test_quality"),
+    },
+}
+
+
+def _make_agent(key: str):
+    """Construct the agent described by _AGENT_SPECS[key]."""
+    from praisonaiagents import Agent
+    
+    from . import tools
+    
+    spec = _AGENT_SPECS[key]
+    return Agent(
+        name=spec["name"],
+        instructions=spec["instructions"],
+        tools=[getattr(tools, tool_name) for tool_name in spec["tools"]],
+    )
+
+
+@functools.cache
+def get_analyzer():
+    """Return the shared Analyzer agent, building it on first call."""
+    return _make_agent("analyzer")
+
+
+@functools.cache
+def get_generator():
+    """Return the shared Generator agent, building it on first call."""
+    return _make_agent("generator")
+
+
+@functools.cache
+def get_validator():
+    """Return the shared Validator agent, building it on first call."""
+    return _make_agent("validator")
+
+
+_GETTERS = {
+    "analyzer": get_analyzer,
+    "generator": get_generator,
+    "validator": get_validator,
+}
+
+
+def __getattr__(name: str):
+    """Resolve the agent names to their shared instances and cache them as globals."""
+    if name in _GETTERS:
+        agent = globals()[name] = _GETTERS[name]()
+        return agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
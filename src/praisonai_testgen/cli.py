@@ -73,6 +73,8 @@ def generate(
         typer.echo(f"✓ Generated {len(result.tests)} tests")
         if result.test_file:
             typer.echo(f"  Output: {result.test_file}")
+        if result.skipped:
+            typer.echo(f"  Skipped {len(result.skipped)} files with nothing to test")
     else:
         typer.echo("✗ Generation failed", err=True)
         for error in result.errors:
@@ -94,6 +96,8 @@ def update(
     
     if result.success:
         typer.echo(f"✓ Updated {len(result.tests)} tests")
+        if result.skipped:
+            typer.echo(f"  Skipped {len(result.skipped)} files with nothing to test")
     else:
         typer.echo("✗ Update failed", err=True)
         raise typer.Exit(1)
@@ -2,10 +2,29 @@
 Main TestGen class - the core test generation engine.
 """
 
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
 from dataclasses import dataclass, field
 from typing import Optional, List, Any
 from pathlib import Path
 
+from . import __version__
+
+# Only memoize generations that took at least this long - cheaper ones
+# are faster to recompute than to round-trip through the cache.
+_MEMO_MIN_SECONDS = 0.05
+
+# Fallback splitter for agent output that is not valid Python
+_TEST_FN_RE = re.compile(r'(def test_\w+.*?)(?=def test_|\Z)', re.DOTALL)
+
+
+class _NoTestableCode(ValueError):
+    """Raised for a source file without functions or classes to test."""
+
 
 @dataclass
 class TestGenConfig:
@@ -17,6 +36,8 @@ class TestGenConfig:
     validation_threshold: float = 7.0
     include_edge_cases: bool = True
     max_tests_per_function: int = 10
+    use_cache: bool = True
+    cache_dir: str = ".testgen/cache"
 
 
 @dataclass
@@ -29,6 +50,72 @@ class GenerationResult:
     coverage: Optional[float] = None
     validation_score: Optional[float] = None
     errors: List[str] = field(default_factory=list)
+    # Files left out because they have nothing to test (e.g. an empty __init__.py)
+    skipped: List[str] = field(default_factory=list)
+
+
+class _MemoCache:
+    """
+    Persistent memo of generated tests, backed by SQLite.
+    
+    Entries are keyed on the source file content, the requested function
+    and the package version, so any edit or upgrade invalidates them.
+    """
+    
+    def __init__(self, cache_dir: str):
+        self.path = Path(cache_dir) / "testgen_v1.sqlite"
+        self._conn: Optional[sqlite3.Connection] = None
+    
+    @staticmethod
+    def key(source: bytes, function_name: Optional[str]) -> str:
+        """Build the cache key for a source file and optional function."""
+        digest = hashlib.sha256()
+        digest.update(f"{__version__}\0{function_name or ''}\0".encode())
+        digest.update(source)
+        return digest.hexdigest()
+    
+    def _connect(self, create: bool) -> Optional[sqlite3.Connection]:
+        if self._conn is None:
+            if not create and not self.path.exists():
+                return None
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS tests (key TEXT PRIMARY KEY, tests TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS validated (digest TEXT PRIMARY KEY)")
+        return self._conn
+    
+    def get(self, key: str) -> Optional[List[str]]:
+        """Return the cached tests for key, or None on a miss."""
+        conn = self._connect(create=False)
+        if conn is None:
+            return None
+        row = conn.execute("SELECT tests FROM tests WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def put(self, key: str, tests: List[str]) -> None:
+        """Store the generated tests under key."""
+        conn = self._connect(create=True)
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO tests (key, tests) VALUES (?, ?)",
+                (key, json.dumps(tests)),
+            )
+    
+    def is_validated(self, digest: str) -> bool:
+        """Return True if test code with this sha256 digest already passed pytest."""
+        conn = self._connect(create=False)
+        if conn is None:
+            return False
+        row = conn.execute("SELECT 1 FROM validated WHERE digest = ?", (digest,)).fetchone()
+        return row is not None
+    
+    def mark_validated(self, digest: str) -> None:
+        """Record that test code with this sha256 digest passed pytest."""
+        conn = self._connect(create=True)
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO validated (digest) VALUES (?)", (digest,))
 
 
 class TestGen:
@@ -52,6 +139,13 @@ class TestGen:
         """
         self.config = config or TestGenConfig()
         self._workflow = None
+        self._cache = _MemoCache(self.config.cache_dir) if self.config.use_cache else None
+        self._pytest_worker = None
+        self._test_cache: dict[bytes, str] = {}
+        self._Agents = None
+        self._Task = None
+        self._agent_triple = None
+        self._mkdir_cache: set[str] = set()
     
     def generate(
         self,
@@ -65,7 +159,7 @@ class TestGen:
         Generate tests for a Python file or function.
         
         Args:
-            target: Path to file or "file.py::function" for specific function
+            target: Path to file or directory, or "file.py::function" for specific function
             output_dir: Where to write tests (default: config.test_dir)
             use_agents: If True, use full agent workflow
             use_llm: If True, use LLM for smarter test generation
@@ -77,10 +171,28 @@ class TestGen:
         Example:
             >>> result = testgen.generate("src/calculator.py")
             >>> result = testgen.generate("src/calculator.py::add")
+            >>> result = testgen.generate("src/")
         """
         # Parse target
         file_path, function_name = self._parse_target(target)
         
+        if os.path.isdir(file_path):
+            # Directories are generated file by file with the direct tools
+            unsupported = [
+                option
+                for option, given in (("use_agents", use_agents), ("a ::function", function_name))
+                if given
+            ]
+            if unsupported:
+                return GenerationResult(
+                    success=False,
+                    errors=[f"{' and '.join(unsupported)} cannot be used with a directory target"],
+                )
+            files = sorted(_iter_py_files(file_path))
+            return self._merge_results(
+                self._generate_many(files, output_dir, use_llm, root=file_path)
+            )
+        
         if use_agents:
             return self._generate_with_agents(file_path, function_name, output_dir)
         else:
@@ -92,65 +204,36 @@ class TestGen:
         function_name: Optional[str],
         output_dir: Optional[str],
         use_llm: bool = False,
+        write: bool = True,
+        skip_empty: bool = False,
     ) -> GenerationResult:
-        """Generate tests using direct tool calls (faster, deterministic)."""
-        from .tools import (
-            parse_python_ast, 
-            generate_test_code, 
-            generate_test_code_llm,
-            extract_source_code,
-            run_pytest_isolated,
-        )
+        """
+        Generate tests using direct tool calls (faster, deterministic).
         
+        With write=False the tests are returned but no file is written,
+        letting batch callers write everything in one pass at the end.
+        With skip_empty, a file with nothing to test (such as an empty
+        __init__.py) succeeds with no tests and is listed in skipped
+        instead of being an error.
+        """
         try:
-            # Step 1: Parse the file
-            parsed = parse_python_ast(file_path)
-            
-            if not parsed["functions"] and not parsed["classes"]:
-                return GenerationResult(
-                    success=False,
-                    errors=["No testable functions or classes found"],
-                )
-            
-            # Step 2: Filter to specific function if requested
-            functions = parsed["functions"]
-            if function_name:
-                functions = [f for f in functions if f["name"] == function_name]
-                if not functions:
-                    return GenerationResult(
-                        success=False,
-                        errors=[f"Function '{function_name}' not found"],
-                    )
-            
-            # Step 3: Generate tests for each function
-            tests = []
-            for func_info in functions:
-                # Skip private functions by default
-                if func_info.get("is_private", False):
-                    continue
-                
-                if use_llm:
-                    # Get source code for better context
-                    source = extract_source_code(file_path, func_info["name"])
-                    test_code = generate_test_code_llm(func_info, source)
-                else:
-                    test_code = generate_test_code(func_info)
-                    
-                tests.append(test_code)
+            # Steps 1-3: Parse, filter and generate (memoized when LLM-free)
+            if use_llm:
+                tests = self._collect_tests(file_path, function_name, use_llm=True)
+            else:
+                tests = self._memoized_generate(file_path, function_name)
             
             # Step 4: Validate tests compile
             if tests:
                 # Create combined test code
                 combined = "import pytest\n\n" + "\n\n".join(tests)
                 
-                # Validate it runs
-                validation = run_pytest_isolated(combined)
-                if not validation["passed"]:
-                    # Tests don't pass - include them anyway but note the issue
-                    pass  # Still include generated tests for user to fix
+                # Validate it runs - only worth a pytest run if it has real assertions
+                if self.config.validation_threshold > 0 and _syntax_ok(combined):
+                    self._validate(combined)
             
             # Step 5: Write tests to file
-            test_file = self._write_tests(tests, file_path, output_dir)
+            test_file = self._write_tests(tests, file_path, output_dir) if write else None
             
             return GenerationResult(
                 success=True,
@@ -159,11 +242,101 @@ class TestGen:
             )
             
         except Exception as e:
+            if skip_empty and isinstance(e, _NoTestableCode):
+                return GenerationResult(success=True, skipped=[file_path])
             return GenerationResult(
                 success=False,
                 errors=[str(e)],
             )
     
+    def _validate(self, combined: str) -> None:
+        """Run pytest on combined test code unless identical code already passed."""
+        digest = hashlib.sha256(combined.encode()).hexdigest()
+        if self._cache is not None and self._cache.is_validated(digest):
+            return
+        
+        validation = self._pytest().run(combined)
+        if validation["passed"]:
+            if self._cache is not None:
+                self._cache.mark_validated(digest)
+        else:
+            # Tests don't pass - include them anyway but note the issue
+            pass  # Still include generated tests for user to fix
+    
+    def _pytest(self):
+        """Return the persistent pytest worker, starting it on first use."""
+        if self._pytest_worker is None:
+            from ._pytest_server import PytestWorker
+            self._pytest_worker = PytestWorker()
+        return self._pytest_worker
+    
+    def _memoized_generate(self, file_path: str, function_name: Optional[str]) -> List[str]:
+        """Template-generate tests, reusing cached output for unchanged sources."""
+        if self._cache is None:
+            return self._collect_tests(file_path, function_name)
+        
+        key = self._cache.key(Path(file_path).read_bytes(), function_name)
+        tests = self._cache.get(key)
+        if tests is not None:
+            return tests
+        
+        # The first call pays for importing tools and praisonaiagents; keep that
+        # out of the timing so it can't make a cheap module look worth caching
+        from . import tools  # noqa: F401
+        
+        start = time.perf_counter()
+        tests = self._collect_tests(file_path, function_name)
+        if time.perf_counter() - start >= _MEMO_MIN_SECONDS:
+            self._cache.put(key, tests)
+        return tests
+    
+    def _collect_tests(
+        self,
+        file_path: str,
+        function_name: Optional[str],
+        use_llm: bool = False,
+    ) -> List[str]:
+        """Parse file_path and generate test code for its public functions."""
+        from .tools import (
+            parse_and_generate,
+            generate_test_code, 
+            generate_test_code_llm,
+            extract_source_code,
+        )
+        
+        if use_llm:
+            def generate(func_info: dict) -> str:
+                # Get source code for better context
+                source = extract_source_code(file_path, func_info["name"])
+                return generate_test_code_llm(func_info, source)
+        else:
+            def generate(func_info: dict) -> str:
+                return self._generate_cached(func_info, generate_test_code)
+        
+        # Steps 1-3: Parse the file and generate tests in the same pass
+        parsed, pairs = parse_and_generate(file_path, function_name, generate)
+        
+        if not parsed["functions"] and not parsed["classes"]:
+            raise _NoTestableCode("No testable functions or classes found")
+        
+        if function_name and not pairs:
+            raise ValueError(f"Function '{function_name}' not found")
+        
+        # Private functions are skipped by default and carry no test code
+        return [test_code for _, test_code in pairs if test_code is not None]
+    
+    def _generate_cached(self, func_info: dict, generate: Any) -> str:
+        """Run generate(func_info), reusing output for identical functions seen before."""
+        # Line numbers only locate the function; they don't affect the generated test
+        signature = hashlib.blake2b(
+            repr(sorted((k, v) for k, v in func_info.items() if k != "lineno")).encode(),
+            digest_size=16,
+        ).digest()
+        test_code = self._test_cache.get(signature)
+        if test_code is None:
+            test_code = self._test_cache[signature] = generate(func_info)
+        return test_code
+    
     def _generate_with_agents(
         self,
         file_path: str,
@@ -171,8 +344,13 @@ class TestGen:
         output_dir: Optional[str],
     ) -> GenerationResult:
         """Generate tests using full agent workflow (smarter, LLM-powered)."""
-        from .agents import analyzer, generator, validator
-        from praisonaiagents import Agents, Task
+        if self._Agents is None:
+            from .agents import analyzer, generator, validator
+            from praisonaiagents import Agents, Task
+            self._Agents, self._Task = Agents, Task
+            self._agent_triple = (analyzer, generator, validator)
+        Agents, Task = self._Agents, self._Task
+        analyzer, generator, validator = self._agent_triple
         
         # Create tasks
         analyze_task = Task(
@@ -225,31 +403,122 @@ class TestGen:
             since: Git ref to compare against (default: HEAD~1)
             
         Returns:
-            GenerationResult with updated tests
+            GenerationResult with updated tests; changed files with nothing
+            to test are listed in its skipped field
         """
         # Get changed files
-        import subprocess
-        result = subprocess.run(
-            ["git", "diff", "--name-only", since, "--", "*.py"],
-            capture_output=True, text=True
-        )
-        changed_files = [f for f in result.stdout.strip().split("\n") if f]
+        changed_files = self._changed_files(since)
         
         # Generate tests for each changed file
+        files = [f for f in changed_files if Path(f).exists()]
+        return self._merge_results(self._generate_many(files))
+    
+    def _merge_results(self, results: List[GenerationResult]) -> GenerationResult:
+        """Combine per-file results into one."""
         all_tests = []
         errors = []
+        skipped = []
         
-        for file_path in changed_files:
-            if Path(file_path).exists():
-                gen_result = self.generate(file_path)
-                all_tests.extend(gen_result.tests)
-                errors.extend(gen_result.errors)
+        for gen_result in results:
+            all_tests.extend(gen_result.tests)
+            errors.extend(gen_result.errors)
+            skipped.extend(gen_result.skipped)
         
         return GenerationResult(
             success=len(errors) == 0,
             tests=all_tests,
             errors=errors,
+            skipped=skipped,
+        )
+    
+    def _changed_files(self, since: str) -> List[str]:
+        """List Python files changed between a git ref and the working tree."""
+        try:
+            import pygit2
+        except ImportError:
+            pygit2 = None
+        
+        if pygit2 is not None:
+            repo_path = pygit2.discover_repository(os.getcwd())
+            if repo_path is not None:
+                repo = pygit2.Repository(repo_path)
+                try:
+                    # ref -> index -> working tree, like `git diff <ref>`,
+                    # so staged additions and renames are included
+                    diff = repo.diff(since, cached=True)
+                except (KeyError, ValueError, pygit2.GitError):
+                    pass  # Unknown ref - let git report it the usual way
+                else:
+                    diff.merge(repo.index.diff_to_workdir())
+                    diff.find_similar()
+                    return [
+                        delta.new_file.path
+                        for delta in diff.deltas
+                        if delta.new_file.path.endswith(".py")
+                    ]
+        
+        import subprocess
+        result = subprocess.run(
+            ["git", "diff", "--name-only", since, "--", "*.py"],
+            capture_output=True, text=True
         )
+        return [f for f in result.stdout.strip().split("\n") if f]
+    
+    def _generate_many(
+        self,
+        files: List[str],
+        output_dir: Optional[str] = None,
+        use_llm: bool = False,
+        root: Optional[str] = None,
+    ) -> List[GenerationResult]:
+        """
+        Generate tests for several files, one worker process per core.
+        
+        Workers only generate; all test files are written here once every
+        file has been processed. Test files are named after each file's
+        module path relative to root (its stem without one); a file whose
+        tests would overwrite another's is reported as an error instead.
+        """
+        if len(files) <= 1:
+            results = [
+                self._generate_direct(
+                    f, None, output_dir, use_llm=use_llm, write=False, skip_empty=True
+                )
+                for f in files
+            ]
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            
+            workers = min(len(files), os.cpu_count() or 1)
+            jobs = [(f, output_dir, use_llm) for f in files]
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=(self.config,)
+            ) as executor:
+                results = list(executor.map(_generate_one, jobs))
+        
+        written = {}
+        for file_path, result in zip(files, results):
+            result.errors = [f"{file_path}: {error}" for error in result.errors]
+            if not (result.success and result.tests):
+                continue
+            
+            module_name = _module_name(file_path, root)
+            test_file = self._test_path(module_name, output_dir)
+            if test_file in written:
+                result.success = False
+                result.errors.append(
+                    f"{file_path}: {test_file} was already written for {written[test_file]}"
+                )
+                continue
+            written[test_file] = file_path
+            try:
+                result.test_file = self._write_tests(
+                    result.tests, file_path, output_dir, module_name=module_name
+                )
+            except Exception as e:
+                result.success = False
+                result.errors.append(f"{file_path}: {e}")
+        return results
     
     def report(self, include_risk: bool = False) -> dict:
         """
@@ -289,19 +558,32 @@ class TestGen:
     
     def _parse_target(self, target: str) -> tuple[str, Optional[str]]:
         """Parse target into file path and optional function name."""
-        if "::" in target:
-            file_path, function_name = target.split("::", 1)
-            return file_path, function_name
-        return target, None
+        file_path, _, function_name = target.partition("::")
+        return file_path, function_name or None
     
     def _extract_tests(self, workflow_result: Any) -> List[str]:
         """Extract test code from workflow result."""
         # Try to extract test code from the workflow result
         if isinstance(workflow_result, str):
-            # Look for def test_ patterns
-            import re
-            tests = re.findall(r'(def test_\w+.*?)(?=def test_|\Z)', workflow_result, re.DOTALL)
-            return tests
+            import ast
+            import io
+            from .tools import _parse_source, _source_segment
+            try:
+                tree = _parse_source(workflow_result, "<workflow result>")
+            except SyntaxError:
+                # Not pure Python (e.g. prose around the code) - scan for def test_ patterns
+                return _TEST_FN_RE.findall(workflow_result)
+            
+            lines = io.StringIO(workflow_result, newline="").readlines()
+            return [
+                # Top-level tests start at column 0 of their first decorator, if any
+                _source_segment(lines, (
+                    (node.decorator_list or [node])[0].lineno - 1, 0,
+                    node.end_lineno - 1, node.end_col_offset,
+                ))
+                for node in tree.body
+                if isinstance(node, ast.FunctionDef) and node.name.startswith("test_")
+            ]
         return []
     
     def _write_tests(
@@ -309,26 +591,84 @@ class TestGen:
         tests: List[str],
         source_file: str,
         output_dir: Optional[str] = None,
+        module_name: Optional[str] = None,
     ) -> Optional[str]:
-        """Write tests to file."""
+        """Write tests to file, importing from module_name (default: the file's stem)."""
         if not tests:
             return None
         
         output_dir = output_dir or self.config.test_dir
-        Path(output_dir).mkdir(parents=True, exist_ok=True)
-        
-        source_name = Path(source_file).stem
-        test_file = Path(output_dir) / f"test_{source_name}.py"
+        if output_dir not in self._mkdir_cache:
+            Path(output_dir).mkdir(parents=True, exist_ok=True)
+            self._mkdir_cache.add(output_dir)
         
-        # Get the module path for imports
-        source_path = Path(source_file)
-        module_name = source_path.stem
+        module_name = module_name or Path(source_file).stem
+        test_file = self._test_path(module_name, output_dir)
         
-        with open(test_file, "w") as f:
-            f.write("import pytest\n")
-            f.write(f"from {module_name} import *\n\n")
-            for test in tests:
-                f.write(test)
-                f.write("\n\n")
+        header = f"import pytest\nfrom {module_name} import *\n\n"
+        test_file.write_text(header + "\n\n".join(tests) + "\n\n")
         
         return str(test_file)
+    
+    def _test_path(self, module_name: str, output_dir: Optional[str] = None) -> Path:
+        """Return the test file for a module, e.g. test_pkg_utils.py for pkg.utils."""
+        output_dir = output_dir or self.config.test_dir
+        return Path(output_dir) / f"test_{module_name.replace('.', '_')}.py"
+
+
+# The pool worker's TestGen, kept for the life of the worker process so its
+# pytest worker and generated-test cache are shared by every file it handles
+_worker_testgen: Optional[TestGen] = None
+
+
+def _init_worker(config: TestGenConfig) -> None:
+    """Create the TestGen used by this pool worker (process pool initializer)."""
+    global _worker_testgen
+    _worker_testgen = TestGen(config)
+
+
+def _generate_one(job: tuple[str, Optional[str], bool]) -> GenerationResult:
+    """Generate tests for a single file (process pool entry point)."""
+    file_path, output_dir, use_llm = job
+    return _worker_testgen._generate_direct(
+        file_path, None, output_dir, use_llm=use_llm, write=False, skip_empty=True
+    )
+
+
+def _module_name(file_path: str, root: Optional[str]) -> str:
+    """Return the dotted module path of file_path under root, or its stem without a root."""
+    path = Path(file_path)
+    if root is None:
+        return path.stem
+    parts = path.relative_to(root).with_suffix("").parts
+    # A package's __init__.py is imported as the package itself
+    if len(parts) > 1 and parts[-1] == "__init__":
+        parts = parts[:-1]
+    return ".".join(parts)
+
+
+def _iter_py_files(root: str):
+    """Yield Python files under root, skipping hidden and __pycache__ directories."""
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if not entry.name.startswith(".") and entry.name != "__pycache__":
+                        stack.append(entry.path)
+                elif entry.name.endswith(".py") and entry.is_file(follow_symlinks=False):
+                    yield entry.path
+
+
+def _syntax_ok(code: str) -> bool:
+    """Return True if code compiles and contains at least one non-trivial assert."""
+    import ast
+    from .tools import _iter_statements, _parse_source
+    try:
+        tree = _parse_source(code, "<generated tests>")
+    except SyntaxError:
+        return False
+    return any(
+        node.__class__ is ast.Assert and node.test.__class__ is not ast.Constant
+        for node in _iter_statements(tree)
+    )
@@ -5,12 +5,82 @@ These tools are shared across agents for code analysis, generation, and validati
 """
 
 import ast
+import atexit
+import copy
+import functools
+import hashlib
+import inspect
+import linecache
+import os
+import re
 import subprocess
+import sys
 import tempfile
-from pathlib import Path
-from typing import Any
+import tokenize
+from collections import OrderedDict, deque
+from typing import Any, Callable, Iterator, Optional, Union
 from praisonaiagents import tool
 
+from . import _ast_cache
+
+# Recently parsed module trees by source sha256, least recently used first
+_TREE_CACHE_SIZE = 64
+_TREE_CACHE: "OrderedDict[bytes, ast.Module]" = OrderedDict()
+
+# Stat key of each file as last revalidated in linecache
+_LINECACHE_KEYS: dict = {}
+
+# Function index of recently extracted-from files by stat key, least recently used first
+_INDEX_CACHE_SIZE = 64
+_INDEX_CACHE: "OrderedDict[tuple, tuple[list, dict]]" = OrderedDict()
+
+# Stat keys whose first extraction already tried the tokenizer fast path
+_SCANNED_KEYS: "OrderedDict[tuple, None]" = OrderedDict()
+
+# Sample argument values used in generated tests, keyed by annotation
+_SAMPLE_VALUES = {
+    "int": "1",
+    "float": "1.0",
+    "str": '"test"',
+    "bool": "True",
+    "list": "[]",
+    "dict": "{}",
+}
+
+# Edge-case hints added to the generated edge test, keyed by annotation
+_EDGE_COMMENTS = {
+    "int": "test with 0, negative, large values",
+    "str": "test with empty string, whitespace",
+    "list": "test with empty list, single item",
+}
+
+# Test skeletons, bound to str.format once and filled in per function
+_BASIC_TEST_TEMPLATE = '''def test_{name}_basic():
+    """Test {name} with basic inputs."""
+    # Arrange
+    {arrange}
+    
+    # Act
+    {act}
+    
+    # Assert
+    assert result is not None  # Basic assertion - replace with specific checks
+'''.format
+
+_EDGE_TEST_TEMPLATE = '''
+
+def test_{name}_edge_cases():
+    """Test {name} edge cases."""
+    # Test with edge values based on types
+'''.format
+
+_FIXTURE_TEMPLATE = '''@pytest.fixture
+def {dep}_fixture():
+    """Fixture for {dep}."""
+    # TODO: Implement fixture
+    return None
+'''.format
+
 
 @tool
 def parse_python_ast(file_path: str) -> dict:
@@ -23,135 +93,454 @@ def parse_python_ast(file_path: str) -> dict:
     Returns:
         Dictionary with functions, classes, and their metadata
     """
-    with open(file_path) as f:
+    # Results are cached and shared - hand callers their own copy
+    return copy.deepcopy(_parse_file(file_path))
+
+
+@tool
+def parse_python_asts(file_paths: list) -> list:
+    """
+    Parse several Python files, spreading the work across processes.
+    
+    Args:
+        file_paths: Paths to the Python files to analyze
+        
+    Returns:
+        parse_python_ast results in the same order as file_paths; each is
+        plain picklable data owned by the caller
+    """
+    if len(file_paths) < 4:
+        # Too few files to pay for starting worker processes
+        return [copy.deepcopy(_parse_file(path)) for path in file_paths]
+    
+    from concurrent.futures import ProcessPoolExecutor
+    
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        return list(executor.map(_parse_file, file_paths, chunksize=8))
+
+
+def parse_and_generate(
+    file_path: str,
+    function_name: Optional[str] = None,
+    generate: Optional[Callable[[dict], str]] = None,
+) -> tuple[dict, list[tuple[dict, Optional[str]]]]:
+    """
+    Parse a file and generate test code for its functions in one call.
+    
+    Args:
+        file_path: Path to the Python file to analyze
+        function_name: Only generate for this function if given
+        generate: Test generator taking function metadata (default: generate_test_code)
+        
+    Returns:
+        The parse_python_ast result and (function_info, test_code) pairs;
+        test_code is None for private functions. Both are the caller's own
+        copies, as with parse_python_ast.
+    """
+    generate = generate or generate_test_code
+    # The cached result is shared - generate callbacks and callers get a copy
+    parsed = copy.deepcopy(_parse_file(file_path))
+    
+    pairs = []
+    for func_info in parsed["functions"]:
+        if function_name and func_info["name"] != function_name:
+            continue
+        test_code = None if func_info.get("is_private", False) else generate(func_info)
+        pairs.append((func_info, test_code))
+    
+    return parsed, pairs
+
+
+def _parse_file(file_path: str) -> dict:
+    """
+    Parse a Python file into the parse_python_ast result dictionary.
+    
+    The result is cached and shared between callers, so treat it as read-only.
+    """
+    stat = os.stat(file_path)
+    parsed = _cached_parse(os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+    return {"file": file_path, **parsed}
+
+
+@functools.lru_cache(maxsize=512)
+def _cached_parse(path: str, mtime_ns: int, size: int) -> dict:
+    """Parse path, reusing an on-disk result for identical source."""
+    with open(path, "rb") as f:
         source = f.read()
     
-    tree = ast.parse(source)
-    
-    functions = []
-    classes = []
-    
-    for node in ast.walk(tree):
-        if isinstance(node, ast.FunctionDef):
-            func_info = {
-                "name": node.name,
-                "args": [arg.arg for arg in node.args.args if arg.arg != "self"],
-                "lineno": node.lineno,
-                "docstring": ast.get_docstring(node),
-                "is_private": node.name.startswith("_"),
-                "decorators": [_get_decorator_name(d) for d in node.decorator_list],
-            }
-            
-            # Extract return annotation if present
-            if node.returns:
-                func_info["return_type"] = ast.unparse(node.returns)
-            
-            # Extract argument types
-            arg_types = {}
-            for arg in node.args.args:
-                if arg.arg != "self" and arg.annotation:
-                    arg_types[arg.arg] = ast.unparse(arg.annotation)
-            if arg_types:
-                func_info["arg_types"] = arg_types
-            
-            # Extract default values
-            defaults = {}
-            # node.args.defaults are aligned to the END of args list
-            args_with_defaults = node.args.args[-len(node.args.defaults):] if node.args.defaults else []
-            for arg, default in zip(args_with_defaults, node.args.defaults):
-                if arg.arg != "self":
-                    defaults[arg.arg] = ast.unparse(default)
-            if defaults:
-                func_info["defaults"] = defaults
-            
-            functions.append(func_info)
-            
-        elif isinstance(node, ast.ClassDef):
-            class_info = {
-                "name": node.name,
-                "lineno": node.lineno,
-                "docstring": ast.get_docstring(node),
-                "methods": [],
-                "is_private": node.name.startswith("_"),
-            }
-            
-            for item in node.body:
-                if isinstance(item, ast.FunctionDef):
-                    class_info["methods"].append({
-                        "name": item.name,
-                        "args": [arg.arg for arg in item.args.args if arg.arg != "self"],
-                        "is_private": item.name.startswith("_"),
-                    })
-            
-            classes.append(class_info)
+    cache_file = _ast_cache.cache_path(source)
+    parsed = _ast_cache.load(cache_file)
+    if parsed is None:
+        parsed = _collect(_parse_cached(source, path))
+        _ast_cache.store(cache_file, parsed)
+    else:
+        _intern_names(parsed)
+    return parsed
+
+
+def _intern_names(parsed: dict) -> None:
+    """
+    Re-intern the identifiers of a result loaded from the disk cache.
+    
+    Unpickled strings are fresh objects, so without this every cached module
+    would carry its own copy of names like "self" or "add".
+    """
+    for info in parsed["functions"]:
+        info["name"] = sys.intern(info["name"])
+        info["args"] = [sys.intern(a) for a in info["args"]]
+    for info in parsed["classes"]:
+        info["name"] = sys.intern(info["name"])
+        for method in info["methods"]:
+            method["name"] = sys.intern(method["name"])
+            method["args"] = [sys.intern(a) for a in method["args"]]
+    parsed["types"] = {
+        sys.intern(name): {
+            "args": {sys.intern(a): t for a, t in types["args"].items()},
+            "return": types["return"],
+        }
+        for name, types in parsed["types"].items()
+    }
+
+
+def _parse_source(source: Union[str, bytes], filename: str) -> ast.Module:
+    """
+    Parse source straight to an AST with compile(PyCF_ONLY_AST).
+    
+    Raw bytes are decoded by the parser itself, honouring any coding cookie.
+    """
+    return compile(source, filename, "exec", flags=ast.PyCF_ONLY_AST, dont_inherit=True)
+
+
+def _parse_cached(source: bytes, filename: str) -> ast.Module:
+    """
+    Parse source bytes, reusing the tree of an identical earlier source.
+    
+    Trees are shared between callers (parse_python_ast, extract_source_code),
+    so treat them as read-only.
+    """
+    key = hashlib.sha256(source).digest()
+    tree = _TREE_CACHE.get(key)
+    if tree is None:
+        tree = _TREE_CACHE[key] = _parse_source(source, filename)
+        if len(_TREE_CACHE) > _TREE_CACHE_SIZE:
+            _TREE_CACHE.popitem(last=False)
+    else:
+        _TREE_CACHE.move_to_end(key)
+    return tree
+
+
+def _collect(tree: ast.AST, nested: bool = False, only_annotated: bool = False) -> dict:
+    """
+    Gather functions, classes, imports and types from a parsed module in one pass.
     
+    Only module-level functions are reported unless nested is True; methods
+    are listed on their class. With only_annotated, unannotated arguments are
+    left out of the types instead of being recorded as "Any".
+    """
+    collector = _Collector(nested=nested, only_annotated=only_annotated)
+    collector.visit(tree)
     return {
-        "file": file_path,
-        "functions": functions,
-        "classes": classes,
-        "imports": _extract_imports(tree),
+        "functions": [info.as_dict() for info in collector.functions],
+        "classes": [info.as_dict() for info in collector.classes],
+        "imports": collector.imports,
+        "types": collector.types,
     }
 
 
+class _FuncInfo:
+    """Parsed function fields, turned into the public dict by as_dict()."""
+    
+    __slots__ = (
+        "name", "args", "lineno", "docstring", "is_private", "decorators",
+        "return_type", "arg_types", "defaults", "is_async",
+    )
+    
+    def __init__(self, node: ast.FunctionDef):
+        self.name = sys.intern(node.name)
+        self.args, self.arg_types, self.defaults = _signature(node, is_method=False)
+        self.lineno = node.lineno
+        self.docstring = _fast_docstring(node)
+        self.is_private = node.name.startswith("_")
+        self.decorators = [_get_decorator_name(d) for d in node.decorator_list]
+        self.return_type = _annot_str(node.returns) if node.returns else None
+        self.is_async = node.__class__ is ast.AsyncFunctionDef
+    
+    def as_dict(self) -> dict:
+        info = {
+            "name": self.name,
+            "args": self.args,
+            "lineno": self.lineno,
+            "docstring": self.docstring,
+            "is_private": self.is_private,
+            "decorators": self.decorators,
+        }
+        # Optional keys are only present when the source provides them
+        if self.return_type is not None:
+            info["return_type"] = self.return_type
+        if self.arg_types:
+            info["arg_types"] = self.arg_types
+        if self.defaults:
+            info["defaults"] = self.defaults
+        if self.is_async:
+            info["is_async"] = True
+        return info
+
+
+class _ClassInfo:
+    """Parsed class fields, turned into the public dict by as_dict()."""
+    
+    __slots__ = ("name", "lineno", "docstring", "methods", "is_private")
+    
+    def __init__(self, node: ast.ClassDef):
+        self.name = sys.intern(node.name)
+        self.lineno = node.lineno
+        self.docstring = _fast_docstring(node)
+        self.methods = []
+        self.is_private = node.name.startswith("_")
+    
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "lineno": self.lineno,
+            "docstring": self.docstring,
+            "methods": self.methods,
+            "is_private": self.is_private,
+        }
+
+
+# Statement-list fields; definitions and imports never appear inside expressions
+# Statement-holding fields, in the order they appear in each node's _fields
+_STMT_FIELDS = ("body", "handlers", "orelse", "finalbody", "cases")
+
+
+def _iter_statements(tree: ast.AST) -> Iterator[ast.AST]:
+    """
+    Yield the statements under tree breadth-first, like ast.walk, but without
+    descending into expressions, which never contain definitions or asserts.
+    """
+    queue = deque([tree])
+    while queue:
+        node = queue.popleft()
+        for field in _STMT_FIELDS:
+            children = getattr(node, field, ())
+            queue.extend(children)
+            yield from children
+
+
+class _Collector(ast.NodeVisitor):
+    """Single-pass collector for functions, classes, imports and types."""
+    
+    def __init__(self, nested: bool = False, only_annotated: bool = False):
+        self.nested = nested
+        self.only_annotated = only_annotated
+        self.functions = []
+        self.classes = []
+        self.imports = []
+        self.types = {}
+    
+    def visit(self, node: ast.AST) -> None:
+        handler = _COLLECTOR_DISPATCH.get(node.__class__)
+        if handler is None:
+            self.generic_visit(node)
+        else:
+            handler(self, node)
+    
+    def generic_visit(self, node: ast.AST) -> None:
+        for field in _STMT_FIELDS:
+            for child in getattr(node, field, ()):
+                self.visit(child)
+    
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
+        self.functions.append(_FuncInfo(node))
+        self.types[sys.intern(node.name)] = _func_types(node, self.only_annotated)
+        
+        # Function bodies are only searched for nested definitions on request
+        if self.nested:
+            self.generic_visit(node)
+    
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        class_info = _ClassInfo(node)
+        
+        for item in node.body:
+            if item.__class__ is ast.FunctionDef:
+                class_info.methods.append({
+                    "name": sys.intern(item.name),
+                    "args": _signature(item, is_method=True)[0],
+                    "is_private": item.name.startswith("_"),
+                })
+                self.types[sys.intern(item.name)] = _func_types(item, self.only_annotated)
+        
+        self.classes.append(class_info)
+        
+        # Methods are reported on the class, not again as top-level functions
+        if self.nested:
+            self.generic_visit(node)
+    
+    def visit_Import(self, node: ast.Import) -> None:
+        for alias in node.names:
+            self.imports.append(alias.name)
+    
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        if node.module:
+            self.imports.append(node.module)
+
+
+# Exact node class -> _Collector handler, built once instead of per collector
+_COLLECTOR_DISPATCH = {
+    ast.FunctionDef: _Collector.visit_FunctionDef,
+    ast.AsyncFunctionDef: _Collector.visit_FunctionDef,
+    ast.ClassDef: _Collector.visit_ClassDef,
+    ast.Import: _Collector.visit_Import,
+    ast.ImportFrom: _Collector.visit_ImportFrom,
+}
+
+
+class _TypeVisitor(ast.NodeVisitor):
+    """
+    Types-only visitor behind infer_types.
+    
+    Unlike _Collector, every function is recorded wherever it is defined:
+    at module level, in classes or nested in other functions. Statements are
+    visited breadth-first in ast.walk order, so a repeated name resolves to
+    the same definition as it always has, and expressions are never entered.
+    """
+    
+    def __init__(self, only_annotated: bool = False):
+        self.only_annotated = only_annotated
+        self.types = {}
+    
+    def visit(self, node: ast.AST) -> None:
+        for child in _iter_statements(node):
+            handler = _TYPE_DISPATCH.get(child.__class__)
+            if handler is not None:
+                handler(self, child)
+    
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
+        self.types[sys.intern(node.name)] = _func_types(node, self.only_annotated)
+
+
+_TYPE_DISPATCH = {
+    ast.FunctionDef: _TypeVisitor.visit_FunctionDef,
+    ast.AsyncFunctionDef: _TypeVisitor.visit_FunctionDef,
+}
+
+
+def _func_types(node: ast.FunctionDef, only_annotated: bool) -> dict:
+    """Return the infer_types view of every argument and the return."""
+    func_types = {
+        "args": {},
+        "return": _annot_str(node.returns) if node.returns else None,
+    }
+    for arg in node.args.args:
+        if arg.annotation:
+            func_types["args"][sys.intern(arg.arg)] = _annot_str(arg.annotation)
+        elif not only_annotated:
+            # Simple heuristic inference
+            func_types["args"][sys.intern(arg.arg)] = "Any"
+    return func_types
+
+
+def _signature(node: ast.FunctionDef, is_method: bool) -> tuple[list, dict, dict]:
+    """
+    Return argument names, annotations and defaults in one pass over the args.
+    
+    For methods the bound first argument (self/cls) is dropped, except on
+    staticmethods.
+    """
+    args_nodes = node.args.args
+    if is_method and args_nodes and not any(
+        isinstance(d, ast.Name) and d.id == "staticmethod" for d in node.decorator_list
+    ):
+        args_nodes = args_nodes[1:]
+    
+    names, arg_types, defaults = [], {}, {}
+    for arg in args_nodes:
+        name = sys.intern(arg.arg)
+        names.append(name)
+        if arg.annotation:
+            arg_types[name] = _annot_str(arg.annotation)
+    
+    # node.args.defaults are aligned to the END of args list
+    n_defaults = len(node.args.defaults)
+    if n_defaults:
+        for arg, default in zip(args_nodes[-n_defaults:], node.args.defaults):
+            defaults[sys.intern(arg.arg)] = _annot_str(default)
+    
+    return names, arg_types, defaults
+
+
+def _fast_docstring(node: Union[ast.FunctionDef, ast.ClassDef]) -> Optional[str]:
+    """
+    Return the raw docstring of a definition, or None.
+    
+    Unlike ast.get_docstring the text is not cleaned up; consumers that show
+    it apply inspect.cleandoc themselves.
+    """
+    first = node.body[0]
+    if first.__class__ is ast.Expr and first.value.__class__ is ast.Constant:
+        value = first.value.value
+        if value.__class__ is str:
+            return value
+    return None
+
+
+def _annot_str(node: ast.expr) -> str:
+    """Render an annotation or default, skipping ast.unparse for plain names."""
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+        return f"{node.value.id}.{node.attr}"
+    return ast.unparse(node)
+
+
 def _get_decorator_name(decorator: ast.expr) -> str:
     """Extract decorator name from AST node."""
-    if isinstance(decorator, ast.Name):
-        return decorator.id
-    elif isinstance(decorator, ast.Attribute):
-        return decorator.attr
-    elif isinstance(decorator, ast.Call):
-        return _get_decorator_name(decorator.func)
-    return ""
-
-
-def _extract_imports(tree: ast.AST) -> list:
-    """Extract import statements from AST."""
-    imports = []
-    for node in ast.walk(tree):
-        if isinstance(node, ast.Import):
-            for alias in node.names:
-                imports.append(alias.name)
-        elif isinstance(node, ast.ImportFrom):
-            if node.module:
-                imports.append(node.module)
-    return imports
+    handler = _DECORATOR_NAMES.get(decorator.__class__)
+    return handler(decorator) if handler else ""
+
+
+# Decorator node class -> name extractor, looked up by exact class
+_DECORATOR_NAMES = {
+    ast.Name: lambda node: node.id,
+    ast.Attribute: lambda node: node.attr,
+    ast.Call: lambda node: _get_decorator_name(node.func),
+}
 
 
 @tool
-def infer_types(code: str) -> dict:
+def infer_types(code: str, only_annotated: bool = False) -> dict:
     """
     Infer types for function parameters and returns.
     
+    Every function is reported, including methods and nested functions.
+    
     Args:
         code: Python code string to analyze
+        only_annotated: Omit unannotated arguments instead of reporting "Any"
         
     Returns:
         Dictionary with inferred type information
     """
-    tree = ast.parse(code)
-    
-    type_info = {}
-    
-    for node in ast.walk(tree):
-        if isinstance(node, ast.FunctionDef):
-            func_types = {
-                "args": {},
-                "return": None,
-            }
-            
-            for arg in node.args.args:
-                if arg.annotation:
-                    func_types["args"][arg.arg] = ast.unparse(arg.annotation)
-                else:
-                    # Simple heuristic inference
-                    func_types["args"][arg.arg] = "Any"
-            
-            if node.returns:
-                func_types["return"] = ast.unparse(node.returns)
-            
-            type_info[node.name] = func_types
+    # Results for source strings are cached and shared - hand callers their own copy
+    return {"types": copy.deepcopy(_infer_source_types(code, only_annotated))}
+
+
+@functools.lru_cache(maxsize=1024)
+def _infer_source_types(code: str, only_annotated: bool) -> dict:
+    """Infer types from a source string; the result is shared, treat it as read-only."""
+    return _infer_tree_types(_parse_source(code, "<string>"), only_annotated)
+
+
+def _infer_tree_types(tree: ast.AST, only_annotated: bool = False) -> dict:
+    """
+    Collect the types of a parsed module's functions and methods.
     
-    return {"types": type_info}
+    The in-process counterpart of infer_types for callers that already hold
+    a tree; returns just the types mapping.
+    """
+    visitor = _TypeVisitor(only_annotated=only_annotated)
+    visitor.visit(tree)
+    return visitor.types
 
 
 @tool
@@ -166,23 +555,150 @@ def extract_source_code(file_path: str, function_name: str) -> str:
     Returns:
         Source code of the function as a string
     """
-    with open(file_path) as f:
-        source = f.read()
+    stat = os.stat(file_path)
+    key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+    
+    indexed = _INDEX_CACHE.get(key)
+    if indexed is None:
+        if key not in _SCANNED_KEYS:
+            # A one-off request for a top-level function is answered without
+            # parsing; any further request for the file indexes it instead
+            _SCANNED_KEYS[key] = None
+            if len(_SCANNED_KEYS) > _INDEX_CACHE_SIZE:
+                _SCANNED_KEYS.popitem(last=False)
+            found = _scan_top_level_def(*key, function_name)
+            if found is not None:
+                return found
+        indexed = _index_file(*key)
+    
+    lines, index = indexed
+    span = index.get(function_name)
+    if span is None:
+        return ""
+    # Whole lines, so a trailing comment on the last line is kept
+    start, end = span
+    return "".join(lines[start:end + 1]).strip()
+
+
+def _source_segment(lines: list, span: tuple) -> str:
+    """
+    ast.get_source_segment over lines that are already split.
+    
+    get_source_segment re-splits the whole source on every call; slicing the
+    cached lines keeps each extraction proportional to the function's size.
+    span is (start line, start col, end line, end col) with 0-based lines and
+    UTF-8 byte columns, as the parser reports them.
+    """
+    start, col, end, end_col = span
+    if start == end:
+        return lines[start].encode()[col:end_col].decode()
+    first = lines[start].encode()[col:].decode()
+    last = lines[end].encode()[:end_col].decode()
+    return "".join([first, *lines[start + 1:end], last])
+
+
+@functools.lru_cache(maxsize=64)
+def _read_text(path: str, mtime_ns: int, size: int) -> str:
+    """Read and decode a source file, honouring any coding cookie."""
+    return "".join(_source_lines(path, mtime_ns, size))
+
+
+def _source_lines(path: str, mtime_ns: int, size: int) -> list:
+    """
+    Return a file's lines from linecache, shared with inspect and traceback.
+    
+    The arguments are the file's stat key; linecache is only revalidated when
+    it differs from the last one seen for path, not on every lookup.
+    """
+    if _LINECACHE_KEYS.get(path) != (mtime_ns, size):
+        linecache.checkcache(path)
+        _LINECACHE_KEYS[path] = (mtime_ns, size)
+    return linecache.getlines(path)
+
+
+# Tokens that end a statement or only carry layout, not source text
+_LAYOUT_TOKENS = frozenset({
+    tokenize.COMMENT, tokenize.NL, tokenize.NEWLINE,
+    tokenize.INDENT, tokenize.DEDENT, tokenize.ENDMARKER,
+})
+
+
+def _scan_top_level_def(path: str, mtime_ns: int, size: int, name: str) -> Optional[str]:
+    """
+    Find the first top-level ``def name(`` with a regex and bracket its body by
+    tokenizing the file up to the end of that function.
     
-    tree = ast.parse(source)
-    source_lines = source.splitlines(keepends=True)
+    Returns None, so the caller falls back to the AST index, when there is no
+    such line or the tokenizer does not confirm it as a def statement (for
+    instance because it sits inside a string).
+    """
+    text = _read_text(path, mtime_ns, size)
+    match = re.search(rf"^def[ \t]+{re.escape(name)}[ \t]*\(", text, re.M)
+    if match is None:
+        return None
+    def_row = text.count("\n", 0, match.start()) + 1
+    
+    lines = _source_lines(path, mtime_ns, size)
+    found = False
+    end_row = None
+    depth = 0
+    header_done = False
+    try:
+        for tok in tokenize.generate_tokens(iter(lines).__next__):
+            if not found:
+                if tok.end <= (def_row, 0):
+                    continue
+                # The first token reaching the matched line must be its def
+                if tok.type != tokenize.NAME or tok.string != "def" or tok.start != (def_row, 0):
+                    return None
+                found = True
+            elif tok.type == tokenize.INDENT:
+                depth += 1
+            elif tok.type == tokenize.DEDENT:
+                depth -= 1
+                if depth == 0:
+                    break
+            elif tok.type == tokenize.NEWLINE:
+                # A one-line def ends at its NEWLINE; otherwise an INDENT follows
+                header_done = depth == 0
+            elif tok.type not in _LAYOUT_TOKENS:
+                if header_done and depth == 0:
+                    break
+                end_row = tok.end[0]
+    except (tokenize.TokenError, SyntaxError):
+        return None
+    
+    if end_row is None:
+        return None
+    return "".join(lines[def_row - 1:end_row]).strip()
+
+
+def _index_file(path: str, mtime_ns: int, size: int) -> tuple[list, dict]:
+    """
+    Split a file into lines and locate every function definition once.
     
-    for node in ast.walk(tree):
-        if isinstance(node, ast.FunctionDef) and node.name == function_name:
-            # Get the line range
-            start_line = node.lineno - 1  # 0-indexed
-            end_line = node.end_lineno if hasattr(node, 'end_lineno') else start_line + 1
-            
-            # Extract and return the source
-            func_source = "".join(source_lines[start_line:end_line])
-            return func_source.strip()
+    Maps each name to the 0-based first and last line of its first definition
+    in breadth-first order, so top-level functions win over same-named methods
+    or nested functions. Results are kept in _INDEX_CACHE by stat key.
+    """
+    key = (path, mtime_ns, size)
+    indexed = _INDEX_CACHE.get(key)
+    if indexed is not None:
+        _INDEX_CACHE.move_to_end(key)
+        return indexed
     
-    return ""
+    with open(path, "rb") as f:
+        source = f.read()
+    
+    index = {}
+    for node in _iter_statements(_parse_cached(source, path)):
+        if node.__class__ is ast.FunctionDef and node.name not in index:
+            index[node.name] = (node.lineno - 1, node.end_lineno - 1)
+    
+    indexed = _INDEX_CACHE[key] = (_source_lines(path, mtime_ns, size), index)
+    if len(_INDEX_CACHE) > _INDEX_CACHE_SIZE:
+        _INDEX_CACHE.popitem(last=False)
+    return indexed
 
 
 @tool
@@ -204,68 +720,46 @@ def generate_test_code(function_info: dict) -> str:
     defaults = function_info.get("defaults", {})
     
     # Generate sample values based on types
-    sample_values = {}
-    for arg in args:
-        arg_type = arg_types.get(arg, "")
-        default = defaults.get(arg)
-        
-        if default:
-            sample_values[arg] = default
-        elif arg_type == "int":
-            sample_values[arg] = "1"
-        elif arg_type == "float":
-            sample_values[arg] = "1.0"
-        elif arg_type == "str":
-            sample_values[arg] = '"test"'
-        elif arg_type == "bool":
-            sample_values[arg] = "True"
-        elif arg_type == "list":
-            sample_values[arg] = "[]"
-        elif arg_type == "dict":
-            sample_values[arg] = "{}"
-        else:
-            sample_values[arg] = "None"
-    
-    # Build argument string
-    arg_assignments = "\n    ".join(
-        f"{arg} = {sample_values.get(arg, 'None')}"
+    samples = tuple(
+        (arg, defaults.get(arg) or _SAMPLE_VALUES.get(arg_types.get(arg, ""), "None"))
         for arg in args
     )
+    # Only types we have edge-case hints for get an edge-case test
+    hinted = tuple(
+        (arg, arg_type) for arg, arg_type in arg_types.items() if arg_type in _EDGE_COMMENTS
+    )
+    return _render_tests(name, samples, hinted, function_info.get("is_async", False))
+
+
+@functools.lru_cache(maxsize=1024)
+def _render_tests(name: str, samples: tuple, hinted: tuple, is_async: bool = False) -> str:
+    """Render the test skeletons for a function from (arg, value) and (arg, type) pairs."""
+    # Build argument string
+    arg_assignments = "\n    ".join(f"{arg} = {value}" for arg, value in samples)
     
     # Build call string
-    call_args = ", ".join(args)
+    call_args = ", ".join(arg for arg, _ in samples)
     
-    # Generate test code with actual assertions
-    test_code = f'''def test_{name}_basic():
-    """Test {name} with basic inputs."""
-    # Arrange
-    {arg_assignments if arg_assignments else "pass  # No arguments"}
+    # Coroutine functions have to be driven to completion, not just called
+    if is_async:
+        act = f"import asyncio\n    result = asyncio.run({name}({call_args}))"
+    else:
+        act = f"result = {name}({call_args})"
     
-    # Act
-    result = {name}({call_args})
-    
-    # Assert
-    assert result is not None  # Basic assertion - replace with specific checks
-'''
+    # Generate test code with actual assertions
+    test_code = _BASIC_TEST_TEMPLATE(
+        name=name,
+        arrange=arg_assignments if arg_assignments else "pass  # No arguments",
+        act=act,
+    )
     
-    # Add edge case tests if we have type info
-    if arg_types:
-        edge_test = f'''
-
-def test_{name}_edge_cases():
-    """Test {name} edge cases."""
-    # Test with edge values based on types
-'''
-        for arg, arg_type in arg_types.items():
-            if arg_type == "int":
-                edge_test += f"    # {arg}: test with 0, negative, large values\n"
-            elif arg_type == "str":
-                edge_test += f"    # {arg}: test with empty string, whitespace\n"
-            elif arg_type == "list":
-                edge_test += f"    # {arg}: test with empty list, single item\n"
-        
-        edge_test += "    assert True  # TODO: implement edge case tests\n"
-        test_code += edge_test
+    if hinted:
+        test_code = "".join([
+            test_code,
+            _EDGE_TEST_TEMPLATE(name=name),
+            *(f"    # {arg}: {_EDGE_COMMENTS[arg_type]}\n" for arg, arg_type in hinted),
+            "    assert True  # TODO: implement edge case tests\n",
+        ])
     
     return test_code
 
@@ -281,18 +775,7 @@ def create_fixtures(dependencies: list) -> str:
     Returns:
         Fixture code as string
     """
-    fixtures = []
-    
-    for dep in dependencies:
-        fixture = f'''@pytest.fixture
-def {dep}_fixture():
-    """Fixture for {dep}."""
-    # TODO: Implement fixture
-    return None
-'''
-        fixtures.append(fixture)
-    
-    return "\n".join(fixtures)
+    return "\n".join(_FIXTURE_TEMPLATE(dep=dep) for dep in dependencies)
 
 
 @tool
@@ -321,35 +804,35 @@ def run_pytest(test_file: str) -> dict:
 
 
 @tool
-def run_pytest_isolated(test_code: str) -> dict:
+def run_pytest_isolated(test_code: str, use_subprocess: bool = False) -> dict:
     """
     Execute pytest on test code in an isolated temporary directory.
     
     Args:
         test_code: Python test code to execute
+        use_subprocess: Run pytest in a warm worker process instead of in-process,
+            for test code that is unsafe to import into the current process
         
     Returns:
         Dictionary with pass/fail status, exit code, and output
     """
+    if use_subprocess:
+        return _pytest_pool().run(test_code)
+    
+    from ._pytest_server import run_code
+    
     with tempfile.TemporaryDirectory() as tmpdir:
-        # Write test code to temp file
-        test_file = Path(tmpdir) / "test_temp.py"
-        test_file.write_text(test_code)
-        
-        # Run pytest
-        result = subprocess.run(
-            ["pytest", str(test_file), "-v", "--tb=short", "-s"],
-            capture_output=True,
-            text=True,
-            cwd=tmpdir,
-        )
-        
-        return {
-            "passed": result.returncode == 0,
-            "exit_code": result.returncode,
-            "stdout": result.stdout,
-            "stderr": result.stderr,
-        }
+        return run_code(test_code, tmpdir)
+
+
+@functools.lru_cache(maxsize=None)
+def _pytest_pool():
+    """Warm pytest worker processes shared by run_pytest_isolated, stopped at exit."""
+    from ._pytest_server import PytestPool
+    
+    pool = PytestPool()
+    atexit.register(pool.close)
+    return pool
 
 
 @tool
@@ -363,27 +846,35 @@ def validate_test_quality(test_code: str) -> dict:
     Returns:
         Dictionary with quality score and feedback
     """
-    try:
-        from testagent import CodeJudge
-        
-        judge = CodeJudge()
-        result = judge.judge(
-            test_code,
-            criteria="well-structured pytest test with meaningful assertions"
-        )
-        
-        return {
-            "score": result.score,
-            "passed": result.passed,
-            "feedback": result.reasoning,
-        }
-    except ImportError:
+    judge = _get_judge()
+    if judge is None:
         # Fallback if testagent not installed
         return {
             "score": 5.0,
             "passed": True,
             "feedback": "testagent not installed - basic validation passed",
         }
+    
+    result = judge.judge(
+        test_code,
+        criteria="well-structured pytest test with meaningful assertions"
+    )
+    
+    return {
+        "score": result.score,
+        "passed": result.passed,
+        "feedback": result.reasoning,
+    }
+
+
+@functools.lru_cache(maxsize=1)
+def _get_judge():
+    """Shared CodeJudge, built on first use; None when testagent is not installed."""
+    try:
+        from testagent import CodeJudge
+    except ImportError:
+        return None
+    return CodeJudge()
 
 
 @tool
@@ -406,6 +897,9 @@ def generate_test_code_llm(function_info: dict, source_code: str = "") -> str:
     return_type = function_info.get("return_type", "")
     docstring = function_info.get("docstring", "")
     defaults = function_info.get("defaults", {})
+    if docstring:
+        # parse_python_ast keeps docstrings raw; dedent them for the prompt
+        docstring = inspect.cleandoc(docstring)
     
     # Build context for the LLM
     context = f"""
@@ -469,6 +963,8 @@ Generate 2-3 test functions with real assertions that verify the function's beha
 
 __all__ = [
     "parse_python_ast",
+    "parse_python_asts",
+    "parse_and_generate",
     "infer_types",
     "extract_source_code",
     "generate_test_code",
@@ -0,0 +1,129 @@
+"""Shared fixtures for TestGen tests."""
+
+import ast
+import bisect
+import contextlib
+import os
+from collections.abc import Mapping
+from textwrap import dedent
+from types import MappingProxyType
+
+import pytest
+
+# Canonical source modules, keyed by fixture name
+FIXTURE_SOURCES = {
+    "add_func": dedent('''
+        def add(a, b):
+            """Add two numbers."""
+            return a + b
+
+        def subtract(a, b):
+            """Subtract two numbers."""
+            return a - b
+    '''),
+    "calc_class": dedent('''
+        class Calculator:
+            """A simple calculator."""
+
+            def add(self, a, b):
+                return a + b
+
+            def subtract(self, a, b):
+                return a - b
+    '''),
+    "typed_add": dedent('''
+        def add(a: int, b: int) -> int:
+            """Add two numbers."""
+            return a + b
+    '''),
+}
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _isolated_ast_cache(tmp_path_factory):
+    """Keep the on-disk AST cache out of the developer's home directory."""
+    from praisonai_testgen import _ast_cache
+    
+    cache_dir = tmp_path_factory.mktemp("ast_cache")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(_ast_cache, "CACHE_DIR", cache_dir)
+        # Subprocesses resolve the directory afresh from the environment
+        mp.setenv("PRAISONAI_TESTGEN_AST_CACHE", str(cache_dir))
+        yield
+
+
+class _SourceFiles(Mapping):
+    """Paths of the canonical sources, each written on first access."""
+    
+    def __init__(self, root, lock_path=None):
+        self._root = root
+        self._lock_path = lock_path
+        self._written = set()
+    
+    def __getitem__(self, name):
+        path = self._root / f"{name}.py"
+        if name not in self._written:
+            source = FIXTURE_SOURCES[name]
+            if self._lock_path is None:
+                lock = contextlib.nullcontext()
+            else:
+                from filelock import FileLock
+                
+                lock = FileLock(self._lock_path)
+            with lock:
+                if not path.exists():
+                    self._root.mkdir(parents=True, exist_ok=True)
+                    path.write_text(source)
+            self._written.add(name)
+        return path
+    
+    def __iter__(self):
+        return iter(FIXTURE_SOURCES)
+    
+    def __len__(self):
+        return len(FIXTURE_SOURCES)
+
+
+@pytest.fixture(scope="session")
+def source_files(tmp_path_factory):
+    """Canonical source files, written lazily; tests must not modify them."""
+    if not os.environ.get("PYTEST_XDIST_WORKER"):
+        return _SourceFiles(tmp_path_factory.mktemp("testgen_fixtures"))
+    
+    # Under pytest-xdist each worker has its own basetemp; share one copy
+    # in their common parent and let the first worker to need a file write it
+    root = tmp_path_factory.getbasetemp().parent / "testgen_fixtures"
+    return _SourceFiles(root, lock_path=f"{root}.lock")
+
+
+@pytest.fixture(scope="session")
+def canonical_sources():
+    """Source text of the canonical modules, keyed by name (read-only)."""
+    return MappingProxyType(FIXTURE_SOURCES)
+
+
+@pytest.fixture(scope="session")
+def parsed_sources():
+    """Canonical sources parsed in one pass over a combined module, split back by name."""
+    names, chunks, starts = [], [], []
+    line = 1
+    for name, source in FIXTURE_SOURCES.items():
+        names.append(name)
+        starts.append(line)
+        chunks.append(source)
+        line += source.count("\n")
+    
+    tree = ast.parse("".join(chunks), filename="<fixture sources>")
+    modules = {name: ast.Module(body=[], type_ignores=[]) for name in names}
+    for node in tree.body:
+        owner = names[bisect.bisect_right(starts, node.lineno) - 1]
+        modules[owner].body.append(node)
+    return modules
+
+
+@pytest.fixture(scope="module")
+def default_testgen():
+    """A default-config TestGen shared by tests that do not change its config."""
+    from praisonai_testgen import TestGen
+    
+    return TestGen()
@@ -1,6 +1,7 @@
 """Tests for PraisonAI TestGen."""
 
 import pytest
+from pathlib import Path
 from praisonai_testgen import TestGen, TestGenConfig
 
 
@@ -32,12 +33,10 @@ class TestTestGenConfig:
 class TestTestGen:
     """Tests for TestGen class."""
     
-    def test_init_default(self):
+    def test_init_default(self, default_testgen):
         """Test default initialization."""
-        testgen = TestGen()
-        
-        assert testgen.config is not None
-        assert testgen.config.test_dir == "tests"
+        assert default_testgen.config is not None
+        assert default_testgen.config.test_dir == "tests"
     
     def test_init_with_config(self):
         """Test initialization with custom config."""
@@ -46,18 +45,409 @@ class TestTestGen:
         
         assert testgen.config.coverage_target == 95
     
-    def test_parse_target_file_only(self):
+    def test_parse_target_file_only(self, default_testgen):
         """Test parsing file-only target."""
-        testgen = TestGen()
-        file_path, function_name = testgen._parse_target("src/calc.py")
+        file_path, function_name = default_testgen._parse_target("src/calc.py")
         
         assert file_path == "src/calc.py"
         assert function_name is None
     
-    def test_parse_target_with_function(self):
+    def test_parse_target_with_function(self, default_testgen):
         """Test parsing target with function specifier."""
-        testgen = TestGen()
-        file_path, function_name = testgen._parse_target("src/calc.py::add")
+        file_path, function_name = default_testgen._parse_target("src/calc.py::add")
         
         assert file_path == "src/calc.py"
         assert function_name == "add"
+    
+    def test_parse_target_empty_function(self, default_testgen):
+        """Test that a trailing '::' without a name targets the whole file."""
+        assert default_testgen._parse_target("src/calc.py::") == ("src/calc.py", None)
+
+
+class TestMemoCache:
+    """Tests for the persistent generation memo cache."""
+    
+    def test_roundtrip(self, tmp_path):
+        """Test that stored tests are returned for the same key."""
+        from praisonai_testgen.testgen import _MemoCache
+        
+        cache = _MemoCache(str(tmp_path))
+        key = cache.key(b"def add(a, b): return a + b", None)
+        
+        assert cache.get(key) is None
+        cache.put(key, ["def test_add_basic():\n    assert True\n"])
+        assert cache.get(key) == ["def test_add_basic():\n    assert True\n"]
+    
+    def test_key_depends_on_function(self):
+        """Test that the requested function is part of the key."""
+        from praisonai_testgen.testgen import _MemoCache
+        
+        source = b"def add(a, b): return a + b"
+        assert _MemoCache.key(source, None) != _MemoCache.key(source, "add")
+    
+    def test_validated_digests(self, tmp_path):
+        """Test that validated test-code digests are remembered."""
+        from praisonai_testgen.testgen import _MemoCache
+        
+        cache = _MemoCache(str(tmp_path))
+        
+        assert cache.is_validated("abc") is False
+        cache.mark_validated("abc")
+        cache.mark_validated("abc")
+        assert cache.is_validated("abc") is True
+    
+    def test_get_does_not_create_database(self, tmp_path):
+        """Test that a cache miss leaves no files behind."""
+        from praisonai_testgen.testgen import _MemoCache
+        
+        cache = _MemoCache(str(tmp_path / "cache"))
+        assert cache.get("missing") is None
+        assert not (tmp_path / "cache").exists()
+    
+    def test_timing_excludes_tools_import(self, tmp_path, monkeypatch):
+        """Test that the memo timer starts only after the tools module is imported."""
+        import sys
+        
+        import praisonai_testgen
+        from praisonai_testgen import testgen
+        
+        source = tmp_path / "calc.py"
+        source.write_text("def add(a, b):\n    return a + b\n")
+        monkeypatch.delitem(sys.modules, "praisonai_testgen.tools", raising=False)
+        monkeypatch.delattr(praisonai_testgen, "tools", raising=False)
+        
+        loaded_at_start = []
+        perf_counter = testgen.time.perf_counter
+        
+        def tracking_perf_counter():
+            loaded_at_start.append("praisonai_testgen.tools" in sys.modules)
+            return perf_counter()
+        
+        monkeypatch.setattr(testgen.time, "perf_counter", tracking_perf_counter)
+        TestGen(TestGenConfig(cache_dir=str(tmp_path / "cache")))._memoized_generate(
+            str(source), None
+        )
+        
+        assert loaded_at_start and loaded_at_start[0] is True
+
+
+class TestGenerateMany:
+    """Tests for multi-file generation used by update()."""
+    
+    def test_generates_each_file(self, tmp_path):
+        """Test that every file gets its own result."""
+        for name in ("alpha", "beta"):
+            (tmp_path / f"{name}.py").write_text(f"def {name}(x: int) -> int:\n    return x\n")
+        
+        config = TestGenConfig(test_dir=str(tmp_path / "tests"), use_cache=False)
+        results = TestGen(config)._generate_many(
+            [str(tmp_path / "alpha.py"), str(tmp_path / "beta.py")]
+        )
+        
+        assert [r.success for r in results] == [True, True]
+        assert [Path(r.test_file).name for r in results] == ["test_alpha.py", "test_beta.py"]
+        assert (tmp_path / "tests" / "test_alpha.py").exists()
+        assert (tmp_path / "tests" / "test_beta.py").exists()
+    
+    def test_pool_worker_reuses_one_testgen(self, tmp_path, monkeypatch):
+        """Test that a pool worker keeps one TestGen, and its caches, across files."""
+        from praisonai_testgen import testgen
+        
+        for name in ("alpha", "beta"):
+            (tmp_path / f"{name}.py").write_text("def double(x: int) -> int:\n    return x * 2\n")
+        monkeypatch.setattr(testgen, "_worker_testgen", None)
+        testgen._init_worker(TestGenConfig(use_cache=False, validation_threshold=0))
+        worker = testgen._worker_testgen
+        
+        first = testgen._generate_one((str(tmp_path / "alpha.py"), None, False))
+        second = testgen._generate_one((str(tmp_path / "beta.py"), None, False))
+        
+        assert testgen._worker_testgen is worker
+        assert first.tests == second.tests
+        assert len(worker._test_cache) == 1
+
+
+class TestExtractTests:
+    """Tests for extracting tests from agent output."""
+    
+    def test_extracts_top_level_tests(self, default_testgen):
+        """Test that only top-level test functions are returned."""
+        output = (
+            "def helper():\n"
+            "    return 1\n"
+            "\n"
+            "def test_one():\n"
+            '    """Mentions def test_fake inside a docstring."""\n'
+            "    assert helper() == 1\n"
+            "\n"
+            "def test_two():\n"
+            "    assert True\n"
+        )
+        
+        tests = default_testgen._extract_tests(output)
+        
+        assert len(tests) == 2
+        assert tests[0].startswith("def test_one():")
+        assert "def test_fake" in tests[0]
+        assert tests[1].startswith("def test_two():")
+    
+    def test_keeps_decorators(self, default_testgen):
+        """Test that parametrized tests keep their decorators."""
+        output = (
+            "import pytest\n"
+            "\n"
+            '@pytest.mark.parametrize("a,b,exp", [(1, 2, 3), (0, 0, 0)])\n'
+            "def test_add(a, b, exp):\n"
+            "    assert a + b == exp\n"
+        )
+        
+        tests = default_testgen._extract_tests(output)
+        
+        assert tests == [output.split("\n\n", 1)[1].rstrip("\n")]
+    
+    def test_falls_back_to_regex_for_prose(self, default_testgen):
+        """Test extraction from output that is not valid Python."""
+        output = "Here are your tests:\ndef test_add():\n    assert add(1, 2) == 3\n"
+        
+        tests = default_testgen._extract_tests(output)
+        
+        assert len(tests) == 1
+        assert tests[0].startswith("def test_add():")
+
+
+class TestLazyImports:
+    """Tests for the package-level lazy imports."""
+    
+    def test_resolved_attribute_is_cached(self):
+        """Test that a lazily imported name is stored on the package."""
+        import praisonai_testgen
+        
+        resolved = praisonai_testgen.TestGenConfig
+        
+        assert praisonai_testgen.__dict__["TestGenConfig"] is resolved
+
+
+class TestSyntaxOk:
+    """Tests for the cheap pre-validation check."""
+    
+    def test_meaningful_assertion(self):
+        """Test that a real assertion warrants a pytest run."""
+        from praisonai_testgen.testgen import _syntax_ok
+        
+        assert _syntax_ok("def test_a():\n    assert add(1, 2) == 3\n") is True
+    
+    def test_trivial_assertion(self):
+        """Test that constant-only assertions are skipped."""
+        from praisonai_testgen.testgen import _syntax_ok
+        
+        assert _syntax_ok("def test_a():\n    assert True\n") is False
+    
+    def test_syntax_error(self):
+        """Test that code which does not compile is skipped."""
+        from praisonai_testgen.testgen import _syntax_ok
+        
+        assert _syntax_ok("def test_a(:\n") is False
+
+
+class TestChangedFiles:
+    """Tests for listing changed files in update()."""
+    
+    @pytest.fixture
+    def repo(self, tmp_path, monkeypatch):
+        """Create a git repo with one commit and a modified working tree."""
+        import subprocess
+        
+        def git(*args):
+            subprocess.run(["git", *args], cwd=tmp_path, check=True, capture_output=True)
+        
+        git("init", "-q")
+        git("config", "user.email", "test@example.com")
+        git("config", "user.name", "Test")
+        (tmp_path / "calc.py").write_text("def add(a, b):\n    return a + b\n")
+        (tmp_path / "notes.txt").write_text("notes\n")
+        git("add", ".")
+        git("commit", "-q", "-m", "initial")
+        (tmp_path / "calc.py").write_text("def add(a, b):\n    return b + a\n")
+        (tmp_path / "notes.txt").write_text("more notes\n")
+        monkeypatch.chdir(tmp_path)
+        return tmp_path
+    
+    def test_lists_changed_python_files(self, repo):
+        """Test that only modified .py files are reported."""
+        assert TestGen()._changed_files("HEAD") == ["calc.py"]
+    
+    def test_falls_back_without_pygit2(self, repo, monkeypatch):
+        """Test the git subprocess fallback when pygit2 is unavailable."""
+        import sys
+        
+        monkeypatch.setitem(sys.modules, "pygit2", None)
+        
+        assert TestGen()._changed_files("HEAD") == ["calc.py"]
+    
+    @pytest.mark.parametrize("pygit2_available", [True, False])
+    def test_includes_staged_additions_and_renames(self, repo, monkeypatch, pygit2_available):
+        """Test that staged new and renamed files are listed, as `git diff <ref>` does."""
+        import subprocess
+        import sys
+        
+        def git(*args):
+            subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True)
+        
+        source = "".join(f"def step_{i}(x):\n    return x + {i}\n\n" for i in range(10))
+        (repo / "helpers.py").write_text(source)
+        git("add", "helpers.py")
+        git("commit", "-q", "-m", "add helpers")
+        git("mv", "helpers.py", "utils.py")
+        (repo / "added.py").write_text("def new(x):\n    return x\n")
+        git("add", "added.py")
+        if not pygit2_available:
+            monkeypatch.setitem(sys.modules, "pygit2", None)
+        
+        assert TestGen()._changed_files("HEAD") == ["added.py", "calc.py", "utils.py"]
+    
+    def test_update_records_files_without_tests(self, repo):
+        """Test that update() lists changed files with nothing to test as skipped."""
+        (repo / "calc.py").write_text("LIMIT = 10\n")
+        
+        config = TestGenConfig(test_dir=str(repo / "tests"), use_cache=False)
+        result = TestGen(config).update("HEAD")
+        
+        assert result.success is True
+        assert result.skipped == ["calc.py"]
+
+
+class TestGenerateCached:
+    """Tests for per-process deduplication of template generation."""
+    
+    def test_identical_functions_generate_once(self):
+        """Test that functions differing only by location share one generation."""
+        calls = []
+        
+        def fake_generate(func_info):
+            calls.append(func_info["name"])
+            return f"def test_{func_info['name']}_basic():\n    pass\n"
+        
+        add_here = {"name": "add", "args": ["a"], "lineno": 1}
+        add_there = {"name": "add", "args": ["a"], "lineno": 40}
+        sub = {"name": "sub", "args": ["a"], "lineno": 1}
+        
+        testgen = TestGen()
+        first = testgen._generate_cached(add_here, fake_generate)
+        second = testgen._generate_cached(add_there, fake_generate)
+        testgen._generate_cached(sub, fake_generate)
+        
+        assert first == second
+        assert calls == ["add", "sub"]
+
+
+class TestDirectoryTarget:
+    """Tests for generating tests for a whole directory."""
+    
+    def test_iter_py_files_skips_hidden_and_cache(self, tmp_path):
+        """Test that only Python files outside hidden/cache dirs are found."""
+        from praisonai_testgen.testgen import _iter_py_files
+        
+        (tmp_path / "pkg").mkdir()
+        (tmp_path / "pkg" / "core.py").write_text("")
+        (tmp_path / "pkg" / "notes.txt").write_text("")
+        (tmp_path / "top.py").write_text("")
+        (tmp_path / ".venv").mkdir()
+        (tmp_path / ".venv" / "site.py").write_text("")
+        (tmp_path / "__pycache__").mkdir()
+        (tmp_path / "__pycache__" / "top.py").write_text("")
+        
+        found = sorted(_iter_py_files(str(tmp_path)))
+        
+        assert found == [str(tmp_path / "pkg" / "core.py"), str(tmp_path / "top.py")]
+    
+    def test_generate_directory(self, tmp_path):
+        """Test that generate() accepts a directory target."""
+        src = tmp_path / "src"
+        src.mkdir()
+        (src / "calc.py").write_text("def add(a: int, b: int) -> int:\n    return a + b\n")
+        
+        config = TestGenConfig(use_cache=False)
+        result = TestGen(config).generate(str(src), output_dir=str(tmp_path / "tests"))
+        
+        assert result.success is True
+        assert (tmp_path / "tests" / "test_calc.py").exists()
+    
+    def test_generate_package_with_empty_init(self, tmp_path):
+        """Test that files with nothing to test are skipped, not reported as errors."""
+        pkg = tmp_path / "pkg"
+        pkg.mkdir()
+        (pkg / "__init__.py").write_text("")
+        (pkg / "calc.py").write_text("def add(a: int, b: int) -> int:\n    return a + b\n")
+        
+        config = TestGenConfig(use_cache=False)
+        result = TestGen(config).generate(str(pkg), output_dir=str(tmp_path / "tests"))
+        
+        assert result.success is True
+        assert result.errors == []
+        assert result.skipped == [str(pkg / "__init__.py")]
+        assert sorted(p.name for p in (tmp_path / "tests").iterdir()) == ["test_calc.py"]
+    
+    @pytest.mark.parametrize(
+        "target, options",
+        [("{src}::add", {}), ("{src}", {"use_agents": True})],
+        ids=["function-selector", "use-agents"],
+    )
+    def test_rejects_file_only_options(self, tmp_path, target, options):
+        """Test that options that only apply to a single file fail for a directory."""
+        src = tmp_path / "src"
+        src.mkdir()
+        (src / "calc.py").write_text("def add(a: int, b: int) -> int:\n    return a + b\n")
+        
+        config = TestGenConfig(use_cache=False)
+        result = TestGen(config).generate(
+            target.format(src=src), output_dir=str(tmp_path / "tests"), **options
+        )
+        
+        assert result.success is False
+        assert "directory target" in result.errors[0]
+        assert not (tmp_path / "tests").exists()
+    
+    def test_same_named_modules_get_separate_test_files(self, tmp_path):
+        """Test that a/utils.py and b/utils.py do not overwrite each other's tests."""
+        src = tmp_path / "src"
+        for package in ("a", "b"):
+            (src / package).mkdir(parents=True)
+            (src / package / "utils.py").write_text(
+                f"def {package}_double(x: int) -> int:\n    return x * 2\n"
+            )
+        
+        config = TestGenConfig(use_cache=False)
+        result = TestGen(config).generate(str(src), output_dir=str(tmp_path / "tests"))
+        
+        assert result.success is True
+        a_tests = (tmp_path / "tests" / "test_a_utils.py").read_text()
+        b_tests = (tmp_path / "tests" / "test_b_utils.py").read_text()
+        assert "from a.utils import *" in a_tests and "a_double" in a_tests
+        assert "from b.utils import *" in b_tests and "b_double" in b_tests
+    
+    def test_reports_colliding_test_files(self, tmp_path):
+        """Test that two files mapping to one test file are reported with their paths."""
+        for package in ("a", "b"):
+            (tmp_path / package).mkdir()
+            (tmp_path / package / "utils.py").write_text("def f(x: int) -> int:\n    return x\n")
+        files = [str(tmp_path / "a" / "utils.py"), str(tmp_path / "b" / "utils.py")]
+        
+        config = TestGenConfig(test_dir=str(tmp_path / "tests"), use_cache=False)
+        results = TestGen(config)._generate_many(files)
+        
+        assert results[0].success is True
+        assert results[1].success is False
+        assert results[1].errors[0].startswith(files[1])
+    
+    def test_write_errors_are_reported_per_file(self, tmp_path):
+        """Test that an unwritable output dir is an error result, not an exception."""
+        src = tmp_path / "src"
+        src.mkdir()
+        (src / "calc.py").write_text("def add(a: int, b: int) -> int:\n    return a + b\n")
+        (tmp_path / "blocked").write_text("not a directory\n")
+        
+        config = TestGenConfig(use_cache=False)
+        result = TestGen(config).generate(str(src), output_dir=str(tmp_path / "blocked"))
+        
+        assert result.success is False
+        assert result.errors[0].startswith(str(src / "calc.py"))
@@ -1,67 +1,175 @@
 """Tests for TestGen tools."""
 
 import pytest
-import tempfile
-from pathlib import Path
 
 
 class TestParseAST:
     """Tests for parse_python_ast tool."""
     
-    def test_parse_simple_function(self):
+    def test_parse_simple_function(self, source_files):
         """Test parsing a simple function."""
         from praisonai_testgen.tools import parse_python_ast
         
-        # Create temp file
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".py", delete=False) as f:
-            f.write('''
-def add(a: int, b: int) -> int:
-    """Add two numbers."""
-    return a + b
-''')
-            temp_path = f.name
+        result = parse_python_ast(str(source_files["typed_add"]))
         
-        try:
-            result = parse_python_ast(temp_path)
-            
-            assert "functions" in result
-            assert len(result["functions"]) == 1
-            
-            func = result["functions"][0]
-            assert func["name"] == "add"
-            assert "a" in func["args"]
-            assert "b" in func["args"]
-        finally:
-            Path(temp_path).unlink()
+        assert "functions" in result
+        assert len(result["functions"]) == 1
+        
+        func = result["functions"][0]
+        assert func["name"] == "add"
+        assert "a" in func["args"]
+        assert "b" in func["args"]
     
-    def test_parse_class(self):
+    def test_parse_class(self, source_files):
         """Test parsing a class with methods."""
         from praisonai_testgen.tools import parse_python_ast
         
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".py", delete=False) as f:
-            f.write('''
-class Calculator:
-    """A simple calculator."""
+        result = parse_python_ast(str(source_files["calc_class"]))
+        
+        assert "classes" in result
+        assert len(result["classes"]) == 1
+        
+        cls = result["classes"][0]
+        assert cls["name"] == "Calculator"
+        assert len(cls["methods"]) == 2
+        
+        # Methods are not reported again as module-level functions
+        assert result["functions"] == []
     
-    def add(self, a, b):
-        return a + b
+    def test_docstrings_are_raw(self, tmp_path):
+        """Test that docstrings are returned without clean-up."""
+        import inspect
+        from praisonai_testgen.tools import parse_python_ast
+        
+        source = tmp_path / "calc.py"
+        source.write_text(
+            'def add(a, b):\n    """Add.\n\n    Returns the sum.\n    """\n    return a + b\n'
+        )
+        
+        docstring = parse_python_ast(str(source))["functions"][0]["docstring"]
+        
+        assert docstring == "Add.\n\n    Returns the sum.\n    "
+        assert inspect.cleandoc(docstring) == "Add.\n\nReturns the sum."
     
-    def subtract(self, a, b):
-        return a - b
-''')
-            temp_path = f.name
+    def test_parse_many_files(self, tmp_path):
+        """Test parsing a batch of files across worker processes."""
+        from praisonai_testgen.tools import parse_python_ast, parse_python_asts
         
-        try:
-            result = parse_python_ast(temp_path)
-            
-            assert "classes" in result
-            assert len(result["classes"]) == 1
-            
-            cls = result["classes"][0]
-            assert cls["name"] == "Calculator"
-            assert len(cls["methods"]) == 2
-        finally:
-            Path(temp_path).unlink()
+        paths = []
+        for i in range(5):
+            source = tmp_path / f"mod{i}.py"
+            source.write_text(f"def func{i}(x):\n    return x\n")
+            paths.append(str(source))
+        
+        results = parse_python_asts(paths)
+        
+        assert [r["functions"][0]["name"] for r in results] == [f"func{i}" for i in range(5)]
+        assert results == [parse_python_ast(path) for path in paths]
+
+
+class TestParseCache:
+    """Tests for parse_python_ast result caching."""
+    
+    def test_reparses_modified_file(self, tmp_path):
+        """Test that editing a file invalidates the cached result."""
+        import os
+        from praisonai_testgen.tools import parse_python_ast
+        
+        source = tmp_path / "calc.py"
+        source.write_text("def add(a, b):\n    return a + b\n")
+        first = parse_python_ast(str(source))
+        
+        source.write_text("def sub(a, b):\n    return a - b\n")
+        stat = source.stat()
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        second = parse_python_ast(str(source))
+        
+        assert [f["name"] for f in first["functions"]] == ["add"]
+        assert [f["name"] for f in second["functions"]] == ["sub"]
+    
+    def test_results_are_independent_copies(self, tmp_path):
+        """Test that mutating a result does not leak into later calls."""
+        from praisonai_testgen.tools import parse_python_ast
+        
+        source = tmp_path / "calc.py"
+        source.write_text("def add(a, b):\n    return a + b\n")
+        
+        parse_python_ast(str(source))["functions"].clear()
+        
+        assert len(parse_python_ast(str(source))["functions"]) == 1
+    
+    def test_reuses_disk_cache_across_processes(self, tmp_path, monkeypatch):
+        """Test that a fresh process loads results from disk without parsing."""
+        from praisonai_testgen import tools
+        
+        monkeypatch.setattr(tools._ast_cache, "CACHE_DIR", tmp_path / "cache")
+        source = tmp_path / "calc.py"
+        source.write_text("def add(a, b):\n    return a + b\n")
+        first = tools.parse_python_ast(str(source))
+        
+        # Simulate a new process: empty in-memory caches, parsing unavailable
+        tools._cached_parse.cache_clear()
+        monkeypatch.setattr(tools, "_TREE_CACHE", tools.OrderedDict())
+        monkeypatch.setattr(tools, "_parse_source", None)
+        
+        assert tools.parse_python_ast(str(source)) == first
+    
+    def test_disk_cache_results_use_interned_names(self, tmp_path, monkeypatch):
+        """Test that names loaded from disk are the interned strings."""
+        import sys
+        from praisonai_testgen import tools
+        
+        monkeypatch.setattr(tools._ast_cache, "CACHE_DIR", tmp_path / "cache")
+        source = tmp_path / "interned.py"
+        source.write_text("def interned_probe(left_arg, right_arg):\n    return left_arg\n")
+        tools.parse_python_ast(str(source))
+        tools._cached_parse.cache_clear()
+        
+        func = tools.parse_python_ast(str(source))["functions"][0]
+        
+        assert func["name"] is sys.intern("".join(["interned_", "probe"]))
+        assert func["args"][0] is sys.intern("".join(["left_", "arg"]))
+    
+    def test_cache_dir_follows_environment(self, tmp_path, monkeypatch):
+        """Test that XDG_CACHE_HOME and the override variable pick the cache directory."""
+        from praisonai_testgen import _ast_cache
+        
+        monkeypatch.delenv("PRAISONAI_TESTGEN_AST_CACHE", raising=False)
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "xdg"))
+        assert _ast_cache._default_cache_dir() == tmp_path / "xdg" / "praisonai_testgen" / "ast"
+        
+        monkeypatch.setenv("PRAISONAI_TESTGEN_AST_CACHE", str(tmp_path / "custom"))
+        assert _ast_cache._default_cache_dir() == tmp_path / "custom"
+        
+        monkeypatch.setenv("PRAISONAI_TESTGEN_AST_CACHE", "0")
+        assert _ast_cache._default_cache_dir() is None
+    
+    def test_disabled_cache_writes_nothing(self, tmp_path, monkeypatch):
+        """Test that parsing works without touching disk when the cache is off."""
+        from praisonai_testgen import tools
+        
+        monkeypatch.setattr(tools._ast_cache, "CACHE_DIR", None)
+        source = tmp_path / "calc.py"
+        source.write_text("def add(a, b):\n    return a + b\n")
+        
+        assert tools.parse_python_ast(str(source))["functions"][0]["name"] == "add"
+        assert [p.name for p in tmp_path.iterdir()] == ["calc.py"]
+    
+    def test_shares_tree_between_tools(self, tmp_path, monkeypatch):
+        """Test that parsing then extracting from one file parses it once."""
+        from praisonai_testgen import tools
+        
+        calls = []
+        parse_source = tools._parse_source
+        monkeypatch.setattr(tools, "_parse_source", lambda *a: calls.append(a) or parse_source(*a))
+        monkeypatch.setattr(tools._ast_cache, "CACHE_DIR", tmp_path / "cache")
+        
+        source = tmp_path / "shared.py"
+        source.write_text("def shared_tree_probe(a, b):\n    return a + b\n")
+        tools.parse_python_ast(str(source))
+        tools.extract_source_code(str(source), "shared_tree_probe")
+        
+        assert len(calls) == 1
 
 
 class TestInferTypes:
@@ -80,6 +188,95 @@ def add(a: int, b: int) -> int:
         assert "types" in result
         assert "add" in result["types"]
         assert result["types"]["add"]["return"] == "int"
+    
+    def test_infer_from_parsed_tree(self):
+        """Test that a pre-parsed module gives the same result as source."""
+        import ast
+        from praisonai_testgen.tools import _infer_tree_types, infer_types
+        
+        code = '''
+def add(a: int, b) -> int:
+    return a + b
+'''
+        
+        assert _infer_tree_types(ast.parse(code)) == infer_types(code)["types"]
+        assert infer_types(code)["types"]["add"]["args"] == {"a": "int", "b": "Any"}
+    
+    def test_infer_from_fixture_tree(self, parsed_sources, canonical_sources):
+        """Test inferring types from a module split out of the combined fixture parse."""
+        from praisonai_testgen.tools import _infer_tree_types, infer_types
+        
+        result = _infer_tree_types(parsed_sources["typed_add"])
+        
+        assert result == infer_types(canonical_sources["typed_add"])["types"]
+        assert result["add"]["return"] == "int"
+    
+    def test_infer_only_annotated(self):
+        """Test that only_annotated leaves out unannotated arguments."""
+        from praisonai_testgen.tools import infer_types
+        
+        code = '''
+def add(a: int, b) -> int:
+    return a + b
+'''
+        result = infer_types(code, only_annotated=True)
+        
+        assert result["types"]["add"] == {"args": {"a": "int"}, "return": "int"}
+    
+    def test_cached_results_are_independent_copies(self):
+        """Test that mutating a result does not leak into later calls."""
+        from praisonai_testgen.tools import infer_types
+        
+        code = "def add(a: int, b: int) -> int:\n    return a + b\n"
+        infer_types(code)["types"]["add"]["args"].clear()
+        
+        assert infer_types(code)["types"]["add"]["args"] == {"a": "int", "b": "int"}
+    
+    def test_infer_nested_functions(self):
+        """Test that methods and nested functions are reported too."""
+        from praisonai_testgen.tools import infer_types
+        
+        code = (
+            "def outer(x: int) -> int:\n"
+            "    def inner(y: str) -> str:\n"
+            "        return y\n"
+            "    return x\n"
+            "\n"
+            "class Calc:\n"
+            "    def add(self, a: int) -> int:\n"
+            "        return a\n"
+        )
+        types = infer_types(code)["types"]
+        
+        assert list(types) == ["outer", "inner", "add"]
+        assert types["inner"] == {"args": {"y": "str"}, "return": "str"}
+    
+    def test_statements_follow_ast_walk_order(self):
+        """Test that _iter_statements yields statements in the order ast.walk does."""
+        import ast
+        
+        from praisonai_testgen.tools import _iter_statements
+        
+        tree = ast.parse(
+            "try:\n"
+            "    def in_body(): pass\n"
+            "except ValueError:\n"
+            "    def in_handler(): pass\n"
+            "else:\n"
+            "    def in_else(): pass\n"
+            "finally:\n"
+            "    def in_finally(): pass\n"
+        )
+        statements = (ast.stmt, ast.excepthandler, ast.match_case)
+        walked = [node for node in ast.walk(tree) if isinstance(node, statements)]
+        
+        assert list(_iter_statements(tree)) == walked
+    
+    def test_tool_schema_takes_source_string(self):
+        """Test that the agent-facing schema only offers a source string."""
+        from praisonai_testgen.tools import infer_types
+        
+        assert infer_types.parameters["properties"]["code"] == {"type": "string"}
 
 
 class TestGenerateTestCode:
@@ -99,3 +296,182 @@ class TestGenerateTestCode:
         
         assert "def test_add_basic" in result
         assert "a, b" in result
+    
+    def test_skips_edge_cases_for_unrecognised_types(self):
+        """Test that no edge-case test is emitted without known types."""
+        from praisonai_testgen.tools import generate_test_code
+        
+        plain = generate_test_code(
+            {"name": "load", "args": ["path"], "arg_types": {"path": "Path"}}
+        )
+        typed = generate_test_code({"name": "load", "args": ["n"], "arg_types": {"n": "int"}})
+        
+        assert "test_load_edge_cases" not in plain
+        assert "# n: test with 0, negative, large values" in typed
+    
+    def test_async_function_test_awaits_the_call(self, tmp_path):
+        """Test that the generated test for a coroutine function actually awaits it."""
+        from praisonai_testgen.tools import generate_test_code, parse_python_ast
+        
+        source = tmp_path / "fetcher.py"
+        source.write_text("async def fetch(n: int):\n    return n\n")
+        info = parse_python_ast(str(source))["functions"][0]
+        assert info["is_async"] is True
+        
+        awaited = []
+        
+        async def fetch(n):
+            awaited.append(n)
+            return n
+        
+        namespace = {"fetch": fetch}
+        exec(generate_test_code(info), namespace)
+        namespace["test_fetch_basic"]()
+        
+        assert awaited == [1]
+
+
+class TestParseAndGenerate:
+    """Tests for the fused parse + generate helper."""
+    
+    def test_pairs_functions_with_tests(self, tmp_path):
+        """Test that public functions get test code and private ones don't."""
+        from praisonai_testgen.tools import parse_and_generate
+        
+        source = tmp_path / "calc.py"
+        source.write_text("def add(a, b):\n    return a + b\n\ndef _helper():\n    pass\n")
+        
+        parsed, pairs = parse_and_generate(str(source))
+        
+        assert len(parsed["functions"]) == 2
+        assert [(info["name"], code is None) for info, code in pairs] == [
+            ("add", False),
+            ("_helper", True),
+        ]
+        assert "def test_add_basic" in pairs[0][1]
+    
+    def test_filters_by_function_name(self, tmp_path):
+        """Test that only the requested function is generated."""
+        from praisonai_testgen.tools import parse_and_generate
+        
+        source = tmp_path / "calc.py"
+        source.write_text("def add(a, b):\n    return a + b\n\ndef sub(a, b):\n    return a - b\n")
+        
+        _, pairs = parse_and_generate(str(source), "sub", generate=lambda info: info["name"])
+        
+        assert pairs == [(pairs[0][0], "sub")]
+        assert pairs[0][0]["name"] == "sub"
+    
+    def test_results_are_independent_copies(self, tmp_path):
+        """Test that mutating the results or callback input leaves the cache intact."""
+        from praisonai_testgen.tools import parse_and_generate, parse_python_ast
+        
+        source = tmp_path / "calc.py"
+        source.write_text("def add(a, b):\n    return a + b\n")
+        
+        def generate(func_info):
+            func_info["args"].clear()
+            return "pass"
+        
+        parsed, _ = parse_and_generate(str(source), generate=generate)
+        parsed["functions"].clear()
+        
+        assert parse_python_ast(str(source))["functions"][0]["args"] == ["a", "b"]
+
+
+class TestPytestWorker:
+    """Tests for the persistent pytest worker."""
+    
+    def test_reuses_process_across_runs(self):
+        """Test that consecutive runs are served by the same worker."""
+        from praisonai_testgen._pytest_server import PytestWorker
+        
+        worker = PytestWorker()
+        try:
+            first = worker.run("def test_ok():\n    print('hello')\n    assert True\n")
+            pid = worker._proc.pid
+            second = worker.run("def test_bad():\n    assert 1 == 2\n")
+            
+            assert first["passed"] is True
+            assert "hello" in first["stdout"]
+            assert second["passed"] is False
+            assert worker._proc.pid == pid
+        finally:
+            worker.close()
+    
+    def test_respawns_after_crash(self):
+        """Test that a crashed worker is replaced on the next run."""
+        from praisonai_testgen._pytest_server import PytestWorker
+        
+        worker = PytestWorker()
+        try:
+            crashed = worker.run("import os\n\ndef test_exit():\n    os._exit(3)\n")
+            recovered = worker.run("def test_ok():\n    assert True\n")
+            
+            assert crashed["passed"] is False
+            assert recovered["passed"] is True
+        finally:
+            worker.close()
+    
+    def test_worker_keeps_caller_import_path(self, monkeypatch):
+        """Test that the worker inherits PYTHONPATH as is and keeps the package importable."""
+        from praisonai_testgen._pytest_server import PytestWorker
+        
+        monkeypatch.setenv("PYTHONPATH", "user_dir")
+        worker = PytestWorker()
+        try:
+            result = worker.run(
+                "import os, praisonai_testgen\n\n"
+                "def test_env():\n"
+                "    assert os.environ['PYTHONPATH'] == 'user_dir'\n"
+            )
+            
+            assert result["passed"] is True, result["stdout"]
+        finally:
+            worker.close()
+    
+    def test_pool_caps_concurrent_workers(self):
+        """Test that concurrent runs share at most size workers."""
+        from concurrent.futures import ThreadPoolExecutor
+        from praisonai_testgen._pytest_server import PytestPool
+        
+        pool = PytestPool(size=2)
+        code = "import os\n\ndef test_pid():\n    print('pid', os.getpid())\n"
+        try:
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                results = list(executor.map(pool.run, [code] * 4))
+            
+            assert all(result["passed"] for result in results)
+            assert len(pool._workers) <= 2
+        finally:
+            pool.close()
+
+
+class TestValidateTestQuality:
+    """Tests for test quality validation."""
+    
+    def test_reuses_judge_across_calls(self, monkeypatch):
+        """Test that CodeJudge is constructed once and then reused."""
+        import sys
+        import types
+        from praisonai_testgen.tools import _get_judge, validate_test_quality
+        
+        created = []
+        
+        class CodeJudge:
+            def __init__(self):
+                created.append(self)
+            
+            def judge(self, code, criteria):
+                return types.SimpleNamespace(score=8.0, passed=True, reasoning="ok")
+        
+        monkeypatch.setitem(sys.modules, "testagent", types.SimpleNamespace(CodeJudge=CodeJudge))
+        _get_judge.cache_clear()
+        try:
+            first = validate_test_quality("def test_a():\n    assert 1\n")
+            second = validate_test_quality("def test_b():\n    assert 2\n")
+        finally:
+            _get_judge.cache_clear()
+        
+        assert first == second == {"score": 8.0, "passed": True, "feedback": "ok"}
+        assert len(created) == 1